@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 from pathlib import Path
@@ -8,14 +7,18 @@ from fastapi import Depends, FastAPI, Header, HTTPException
 from pydantic import BaseModel, Field
 
 from app import APP_VERSION
+from app.coordinator import DEFAULT_MAX_SHARD_SIZE, DEFAULT_SHARD_BY, DEFAULT_SHARD_TIMEOUT, coordinate
+from checker.collector import FileCollector
 from checker.inspector import inspect_hosts
+from checker.scheduling import DurationStore
+from checker.selection import filter_hosts
 from config.loader import load_settings
+from config.models import Host
 from main import parse_tags, setup_logging
-from reporter.reporter import generate_report
+from reporter.reporter import generate_report, load_report
 
 logger = logging.getLogger(__name__)
 REPORT_DIR = Path("reports")
-REPORT_DIR.mkdir(exist_ok=True)
 
 
 class RunRequest(BaseModel):
@@ -23,13 +26,37 @@ class RunRequest(BaseModel):
     tags: Optional[str] = Field(None, description="Comma separated tag filters, e.g., env=prod,role=db")
     commands: Optional[List[str]] = Field(None, description="Override default command list")
     max_workers: int = Field(5, gt=0, le=64, description="Thread pool size")
+    deadline: Optional[float] = Field(None, gt=0, description="Run-wide deadline in seconds; unfinished hosts become timeout")
+    use_history: bool = Field(True, description="Submit historically slow hosts first")
+    collect: Optional[List[str]] = Field(None, description="Remote files/globs to pull via SFTP")
+    collect_compress: bool = Field(False, description="Gzip collected files on the fly")
+    collect_bwlimit: Optional[float] = Field(None, gt=0, description="Total collection bandwidth cap in KiB/s")
     log_level: str = Field("INFO", description="Root logger level")
 
 
+class ShardRequest(BaseModel):
+    hosts: List[Host] = Field(..., min_length=1, description="Already filtered hosts assigned by a coordinator")
+    commands: Optional[List[str]] = Field(None, description="Override default command list")
+    max_workers: int = Field(5, gt=0, le=64, description="Thread pool size")
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds left of the coordinator's run deadline")
+    use_history: bool = Field(True, description="Submit historically slow hosts first")
+    collect: Optional[List[str]] = Field(None, description="Remote files/globs to pull via SFTP into this worker's collected/")
+    collect_compress: bool = Field(False, description="Gzip collected files on the fly")
+    collect_bwlimit: Optional[float] = Field(None, gt=0, description="This worker's collection bandwidth cap in KiB/s")
+
+
+class CoordinateRequest(RunRequest):
+    workers: List[str] = Field(..., min_length=1, description="Worker base URLs, e.g., http://10.0.0.5:8080")
+    shard_by: str = Field(DEFAULT_SHARD_BY, description="Host tag used to split shards")
+    max_shard_size: int = Field(DEFAULT_MAX_SHARD_SIZE, gt=0, description="Max hosts per shard")
+    shard_timeout: float = Field(DEFAULT_SHARD_TIMEOUT, gt=0, description="Per-shard HTTP timeout in seconds")
+
+
 class RunResult(BaseModel):
     report_path: str
     summary: Dict[str, Any]
     results: List[Dict[str, Any]]
+    divergence: Dict[str, Any] = Field(default_factory=dict)
 
 
 app = FastAPI(
@@ -71,13 +98,78 @@ def run_inspection(payload: RunRequest, _auth: None = Depends(require_api_token)
     hosts = [host.model_dump() for host in settings.hosts]
 
     tags_filter = parse_tags(payload.tags)
+    duration_store = DurationStore() if payload.use_history else None
     results = inspect_hosts(
         hosts,
         tags_filter=tags_filter,
         commands=payload.commands,
         max_workers=payload.max_workers,
+        deadline=payload.deadline,
+        duration_store=duration_store,
+        collector=FileCollector(
+            paths=payload.collect,
+            compress=payload.collect_compress,
+            bwlimit=payload.collect_bwlimit * 1024 if payload.collect_bwlimit else None,
+        ),
+    )
+    report_path = generate_report(
+        results,
+        summary_extra={"scheduling": duration_store.last_run} if duration_store else None,
+    )
+    if not report_path:
+        raise HTTPException(status_code=500, detail="Failed to generate report")
+
+    report_content = _load_report(report_path)
+    return RunResult(
+        report_path=report_path,
+        summary=report_content.get("summary", {}),
+        results=report_content.get("results", []),
+        divergence=report_content.get("divergence", {}),
+    )
+
+
+@app.post("/shard")
+def run_shard(payload: ShardRequest, _auth: None = Depends(require_api_token)) -> dict:
+    """Worker side of coordinator mode: inspect the given hosts, return raw results."""
+    results = inspect_hosts(
+        [host.model_dump() for host in payload.hosts],
+        commands=payload.commands,
+        max_workers=payload.max_workers,
+        deadline=payload.deadline,
+        duration_store=DurationStore() if payload.use_history else None,
+        collector=FileCollector(
+            paths=payload.collect,
+            compress=payload.collect_compress,
+            bwlimit=payload.collect_bwlimit * 1024 if payload.collect_bwlimit else None,
+        ),
+    )
+    return {"results": results}
+
+
+@app.post("/coordinate", response_model=RunResult)
+def run_coordinated(payload: CoordinateRequest, _auth: None = Depends(require_api_token)) -> RunResult:
+    """Coordinator side: shard the filtered host set across workers and merge one report."""
+    setup_logging(payload.log_level)
+    settings = load_settings(payload.hosts_file)
+    hosts = filter_hosts([host.model_dump() for host in settings.hosts], parse_tags(payload.tags))
+    if not hosts:
+        raise HTTPException(status_code=400, detail="No hosts matched the tag filter")
+
+    results, stats = coordinate(
+        hosts,
+        payload.workers,
+        commands=payload.commands,
+        max_workers=payload.max_workers,
+        deadline=payload.deadline,
+        shard_by=payload.shard_by,
+        max_shard_size=payload.max_shard_size,
+        shard_timeout=payload.shard_timeout,
+        use_history=payload.use_history,
+        collect=payload.collect,
+        collect_compress=payload.collect_compress,
+        collect_bwlimit=payload.collect_bwlimit,
     )
-    report_path = generate_report(results)
+    report_path = generate_report(results, summary_extra={"distributed": stats})
     if not report_path:
         raise HTTPException(status_code=500, detail="Failed to generate report")
 
@@ -86,6 +178,7 @@ def run_inspection(payload: RunRequest, _auth: None = Depends(require_api_token)
         report_path=report_path,
         summary=report_content.get("summary", {}),
         results=report_content.get("results", []),
+        divergence=report_content.get("divergence", {}),
     )
 
 
@@ -106,5 +199,7 @@ def _load_report(report_path: Union[str, Path]) -> Dict[str, Any]:
     path = Path(report_path)
     if not path.exists():
         raise HTTPException(status_code=404, detail=f"Report {report_path} not found")
-    with open(path, "r", encoding="utf-8") as fp:
-        return json.load(fp)
+    try:
+        return load_report(path)
+    except ValueError as exc:
+        raise HTTPException(status_code=500, detail=f"Report {report_path} is corrupt: {exc}")
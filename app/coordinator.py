@@ -0,0 +1,219 @@
+"""Coordinator mode: shard the host set across worker API instances over HTTP."""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from checker.deadline import RunDeadline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_BY = "region"
+DEFAULT_MAX_SHARD_SIZE = 50
+DEFAULT_SHARD_TIMEOUT = 600.0
+# 截止时间之外给 worker 留出写回结果的余量
+DEADLINE_GRACE = 10.0
+
+
+def split_shards(
+    hosts: List[dict],
+    shard_by: str = DEFAULT_SHARD_BY,
+    max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+) -> List[Dict[str, Any]]:
+    """按标签值分组 (无该标签的归入 default), 大组再按 max_shard_size 切块."""
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for host_config in hosts:
+        groups[host_config.get("tags", {}).get(shard_by, "default")].append(host_config)
+
+    shards = []
+    for key, members in groups.items():
+        for index, offset in enumerate(range(0, len(members), max_shard_size)):
+            shards.append(
+                {
+                    "id": f"{key}#{index}",
+                    "key": key,
+                    "hosts": members[offset : offset + max_shard_size],
+                    "attempts": 0,
+                }
+            )
+    return shards
+
+
+def post_shard(worker_url: str, payload: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+    """POST one shard to a worker's /shard endpoint and return its raw results."""
+    headers = {"Content-Type": "application/json"}
+    token = os.getenv("API_TOKEN")
+    if token:
+        headers["X-API-Key"] = token
+    request = urllib.request.Request(
+        worker_url.rstrip("/") + "/shard",
+        data=json.dumps(payload).encode("utf-8"),
+        headers=headers,
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)["results"]
+
+
+def coordinate(
+    hosts: List[dict],
+    workers: List[str],
+    commands: Optional[List[str]] = None,
+    max_workers: int = 5,
+    deadline: Optional[float] = None,
+    shard_by: str = DEFAULT_SHARD_BY,
+    max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+    shard_timeout: float = DEFAULT_SHARD_TIMEOUT,
+    use_history: bool = True,
+    collect: Optional[List[str]] = None,
+    collect_compress: bool = False,
+    collect_bwlimit: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Dispatch shards to workers and merge their results.
+
+    每个 worker 一个派发线程, 同一时间处理一个分片. 连接失败/超时/5xx 时摘除该
+    worker, 分片重新入队交给其他 worker; 4xx 说明分片本身有问题, 直接记为失败不重试.
+    deadline 对整次协调生效: 每个分片只拿到剩余时间, 到期后不再派发, 未派发主机记为 timeout.
+    collect_bwlimit 为总带宽上限, 按 worker 数均分. 返回 (合并结果, 分布式统计).
+    """
+    shards = split_shards(hosts, shard_by=shard_by, max_shard_size=max_shard_size)
+    run_deadline = RunDeadline(deadline)
+    pending_shards: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    for shard in shards:
+        pending_shards.put(shard)
+
+    lock = threading.Lock()
+    results: List[Dict[str, Any]] = []
+    unfinished = len(shards)
+    worker_stats = {url: {"shards": 0, "hosts": 0, "failures": 0, "alive": True} for url in workers}
+    reassigned = 0
+
+    def expired() -> bool:
+        remaining = run_deadline.remaining()
+        return remaining is not None and remaining <= 0
+
+    def finish(shard_results: List[Dict[str, Any]]) -> None:
+        nonlocal unfinished
+        with lock:
+            results.extend(shard_results)
+            unfinished -= 1
+
+    def dispatch(worker_url: str) -> None:
+        while True:
+            with lock:
+                if unfinished == 0:
+                    return
+            if expired():
+                return
+            try:
+                shard = pending_shards.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if expired():
+                pending_shards.put(shard)
+                return
+            remaining = run_deadline.remaining()
+            shard["attempts"] += 1
+            payload = {
+                "hosts": shard["hosts"],
+                "commands": commands,
+                "max_workers": max_workers,
+                "deadline": remaining,
+                "use_history": use_history,
+                "collect": collect,
+                "collect_compress": collect_compress,
+                "collect_bwlimit": collect_bwlimit / len(workers) if collect_bwlimit else None,
+            }
+            timeout = shard_timeout if remaining is None else min(shard_timeout, remaining + DEADLINE_GRACE)
+            start = time.perf_counter()
+            try:
+                shard_results = post_shard(worker_url, payload, timeout=timeout)
+            except Exception as exc:
+                if isinstance(exc, urllib.error.HTTPError) and exc.code < 500:
+                    # 请求被 worker 拒绝 (校验/鉴权失败), 换 worker 结果也一样, worker 本身仍可用
+                    with lock:
+                        worker_stats[worker_url]["failures"] += 1
+                    finish(_failed_results(shard, f"分片 {shard['id']} 被 {worker_url} 拒绝: HTTP {exc.code} {exc.reason}"))
+                    continue
+                drop_worker(worker_url, shard, exc)
+                return
+
+            for result in shard_results:
+                result["worker"] = worker_url
+                result["shard"] = shard["id"]
+            with lock:
+                worker_stats[worker_url]["shards"] += 1
+                worker_stats[worker_url]["hosts"] += len(shard["hosts"])
+            logger.info(
+                "分片 %s (%d 台) 由 %s 完成, 耗时 %.3fs",
+                shard["id"],
+                len(shard["hosts"]),
+                worker_url,
+                time.perf_counter() - start,
+            )
+            finish(shard_results)
+
+    def drop_worker(worker_url: str, shard: Dict[str, Any], exc: Exception) -> None:
+        """连接失败/超时/5xx: 摘除 worker, 分片交给其他 worker 或在重试耗尽后记为失败."""
+        nonlocal reassigned
+        logger.warning("Worker %s 处理分片 %s 失败: %s", worker_url, shard["id"], exc)
+        with lock:
+            worker_stats[worker_url]["failures"] += 1
+            worker_stats[worker_url]["alive"] = False
+        if shard["attempts"] < len(workers):
+            with lock:
+                reassigned += 1
+            pending_shards.put(shard)
+        else:
+            finish(_failed_results(shard, f"分片 {shard['id']} 重试耗尽: {exc}"))
+
+    threads = [threading.Thread(target=dispatch, args=(url,), daemon=True) for url in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 截止时间已到或所有 worker 均已摘除时, 队列中剩余分片无人处理
+    timed_out = expired()
+    while not pending_shards.empty():
+        shard = pending_shards.get_nowait()
+        if timed_out:
+            finish(_failed_results(shard, f"分片 {shard['id']} 超出巡检截止时间, 未派发", status="timeout"))
+        else:
+            finish(_failed_results(shard, f"分片 {shard['id']} 无可用 worker"))
+
+    stats = {
+        "workers": worker_stats,
+        "shards": len(shards),
+        "reassigned_shards": reassigned,
+        "shard_by": shard_by,
+    }
+    return results, stats
+
+
+def _failed_results(shard: Dict[str, Any], message: str, status: str = "failed") -> List[Dict[str, Any]]:
+    logger.error(message)
+    return [
+        {
+            "name": host_config.get("name") or host_config["host"],
+            "host": host_config["host"],
+            "status": status,
+            "error": message,
+            "errors": [message],
+            "alerts": [],
+            "checks": {},
+            "timestamp": datetime.now().isoformat(),
+            "duration": 0.0,
+            "not_started": True,
+            "shard": shard["id"],
+        }
+        for host_config in shard["hosts"]
+    ]
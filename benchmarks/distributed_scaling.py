@@ -0,0 +1,87 @@
+"""Coordinator scaling benchmark with 1, 2 and 4 local worker instances.
+
+Each worker is the real FastAPI app served by uvicorn on its own port, and
+runs the real inspect_hosts thread pool; only the SSH session itself is
+replaced by a sleep of --host-latency seconds.
+
+    python benchmarks/distributed_scaling.py --hosts 200 --host-latency 0.05
+"""
+
+import argparse
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import uvicorn  # noqa: E402
+
+from app import api  # noqa: E402
+from app.coordinator import coordinate  # noqa: E402
+from checker import inspector  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_workers(count: int):
+    servers, urls = [], []
+    for _ in range(count):
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        servers.append(server)
+        urls.append(f"http://127.0.0.1:{port}")
+    return servers, urls
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Coordinator/worker scaling benchmark")
+    parser.add_argument("--hosts", type=int, default=200, help="模拟主机数")
+    parser.add_argument("--host-latency", type=float, default=0.05, help="每台主机模拟巡检耗时 (s)")
+    parser.add_argument("--max-workers", type=int, default=5, help="每个 worker 的线程数")
+    parser.add_argument("--regions", type=int, default=8, help="按 region 标签划分的分组数")
+    parser.add_argument("--shard-size", type=int, default=25, help="单个分片最大主机数")
+    args = parser.parse_args()
+
+    def simulated_host(host_config, default_commands, **_kwargs):
+        time.sleep(args.host_latency)
+        return {"name": host_config["name"], "host": host_config["host"], "status": "success", "alerts": [], "checks": {}, "duration": args.host_latency}
+
+    inspector.inspect_single_host = simulated_host
+    os.chdir(tempfile.mkdtemp(prefix="bench_distributed_"))
+
+    hosts = [
+        {"host": f"10.0.0.{i}", "name": f"h{i}", "username": "root", "password": "x", "tags": {"region": f"r{i % args.regions}"}}
+        for i in range(args.hosts)
+    ]
+    baseline = None
+    print(f"{'workers':>7}  {'wall(s)':>8}  {'hosts/s':>8}  {'speedup':>7}")
+    for count in (1, 2, 4):
+        servers, urls = start_workers(count)
+        # worker 启动时会把根日志重置为 INFO, 压低以免刷屏
+        logging.getLogger().setLevel(logging.WARNING)
+        start = time.perf_counter()
+        results, _stats = coordinate(hosts, urls, max_workers=args.max_workers, max_shard_size=args.shard_size)
+        wall = time.perf_counter() - start
+        for server in servers:
+            server.should_exit = True
+        assert len(results) == args.hosts
+        baseline = baseline or wall
+        print(f"{count:>7}  {wall:>8.2f}  {args.hosts / wall:>8.1f}  {baseline / wall:>6.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
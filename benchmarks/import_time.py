@@ -0,0 +1,61 @@
+"""Import-time regression check for the CLI fast paths.
+
+Runs ``python -X importtime main.py --help`` and fails when the cumulative
+import time exceeds the budget or when a heavy module sneaks back into the
+startup path.
+
+    python benchmarks/import_time.py --budget-ms 150
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ("paramiko", "pydantic", "fastapi", "cryptography")
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(argv: List[str]) -> Dict[str, int]:
+    """Return top-level module -> cumulative import time (us) for one CLI run."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(PROJECT_ROOT / "main.py"), *argv],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    timings: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            timings[match.group(4)] = int(match.group(2))
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CLI import-time budget check")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="累计导入耗时预算 (ms)")
+    parser.add_argument("--top", type=int, default=10, help="打印最慢的 N 个模块")
+    args = parser.parse_args()
+
+    timings = measure(["--help"])
+    total_ms = sum(timings.values()) / 1000
+    for name, cumulative in sorted(timings.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{cumulative / 1000:8.1f} ms  {name}")
+    print(f"total: {total_ms:.1f} ms (budget {args.budget_ms:.1f} ms)")
+
+    leaked = [name for name in timings if name.split(".")[0] in HEAVY_MODULES]
+    if leaked:
+        print(f"FAIL: heavy modules imported on --help: {', '.join(leaked)}")
+        return 1
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Logging contention benchmark: direct handlers vs. the queue listener.
+
+N worker threads log the same per-host records the inspector emits. The
+"direct" setup mirrors the old setup_logging (StreamHandler + RotatingFileHandler
+on the root logger, formatted and written under the handler lock in each
+worker); "queue" is the current main.setup_logging. Reported time is how long
+the worker threads spend in logging calls, which is what inspections wait on.
+
+    python benchmarks/logging_contention.py --threads 32 --records 2000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import main  # noqa: E402
+
+
+def direct_setup() -> None:
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    formatter = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    Path("logs").mkdir(exist_ok=True)
+    for handler in (
+        logging.StreamHandler(),
+        RotatingFileHandler("logs/app.log", maxBytes=1_000_000, backupCount=3, encoding="utf-8"),
+    ):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+
+
+def run(threads: int, records: int) -> float:
+    logger = logging.getLogger("checker.inspector")
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        host = f"10.0.{index // 256}.{index % 256}"
+        barrier.wait()
+        for i in range(records):
+            logger.info("→ %s: %s (%.3fs)", host, "success", i / 1000, extra={"host": host, "phase": "done"})
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main_benchmark() -> int:
+    parser = argparse.ArgumentParser(description="Logging contention benchmark")
+    parser.add_argument("--threads", type=int, default=32, help="并发线程数")
+    parser.add_argument("--records", type=int, default=2000, help="每个线程的日志条数")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="bench_logging_"))
+    real_stderr = sys.stderr
+    sys.stderr = open(os.devnull, "w")
+    try:
+        direct_setup()
+        direct = run(args.threads, args.records)
+        main.setup_logging("INFO")
+        queued = run(args.threads, args.records)
+        main.setup_logging("INFO", sample_rate=0.1)
+        sampled = run(args.threads, args.records)
+        main._stop_log_listener()
+    finally:
+        sys.stderr.close()
+        sys.stderr = real_stderr
+
+    total = args.threads * args.records
+    print(f"{'setup':<14}{'worker time(s)':>15}{'records/s':>12}")
+    for name, elapsed in (("direct", direct), ("queue", queued), ("queue+sample", sampled)):
+        print(f"{name:<14}{elapsed:>15.3f}{total / elapsed:>12.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark())
@@ -0,0 +1,235 @@
+"""SFTP file collection: stream remote logs/configs into local storage per host."""
+
+import fnmatch
+import gzip
+import json
+import logging
+import os
+import posixpath
+import re
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECT_DIR = Path("collected")
+DEFAULT_MAX_FILES = 100
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+CHUNK_SIZE = 32768
+PREFETCH_REQUESTS = 64
+STATE_FILE = ".collect_state.json"
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every worker thread to cap the total transfer rate."""
+
+    def __init__(self, bytes_per_sec: float):
+        self.rate = float(bytes_per_sec)
+        self._allowance = self.rate
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes: int) -> None:
+        """先记账后等待: 额度透支时按欠额睡眠, 多线程合计速率不超过上限."""
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= nbytes
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class FileCollector:
+    """Pull files over SFTP on an already connected SSHClient.
+
+    Reads are prefetched (pipelined) and streamed straight to disk, optionally
+    gzip-compressed. Files whose size and mtime match the last collection are
+    skipped, and interrupted uncompressed downloads resume from the .part file.
+    """
+
+    def __init__(
+        self,
+        paths: Optional[List[str]] = None,
+        dest_dir: Union[str, Path] = DEFAULT_COLLECT_DIR,
+        compress: bool = False,
+        bwlimit: Optional[float] = None,
+    ):
+        self.paths = [p for p in (paths or []) if p]
+        self.dest_dir = Path(dest_dir)
+        self.compress = compress
+        self.limiter = BandwidthLimiter(bwlimit) if bwlimit else None
+        # 本次巡检中每个主机目录只归一台主机, 防止多个线程同时写同一份状态/.part 文件
+        self._claimed: Dict[str, str] = {}
+        self._claim_lock = threading.Lock()
+
+    def paths_for(self, host_config: Dict[str, Any]) -> List[str]:
+        """Run-level paths plus the host's own collect list, de-duplicated in order."""
+        return list(dict.fromkeys(self.paths + host_config.get("collect", [])))
+
+    def _claim_host_dir(self, host_config: Dict[str, Any]) -> Path:
+        """未命名且非 22 端口的主机目录带上端口; 规整后重名的主机直接拒绝."""
+        port = host_config.get("port", 22)
+        name = host_config.get("name")
+        if not name:
+            name = host_config["host"] if port == 22 else f"{host_config['host']}_{port}"
+        dir_name = _safe_name(name)
+        owner = f"{host_config.get('name') or host_config['host']} ({host_config['host']}:{port})"
+        with self._claim_lock:
+            claimed_by = self._claimed.setdefault(dir_name, owner)
+            if claimed_by != owner:
+                raise ValueError(f"收集目录 {dir_name} 已被 {claimed_by} 使用, 请为主机配置唯一的 name")
+        return self.dest_dir / dir_name
+
+    def collect(self, ssh, host_config: Dict[str, Any], deadline=None) -> Dict[str, Any]:
+        """Collect every matching file for one host and return its manifest."""
+        host_dir = self._claim_host_dir(host_config)
+        max_files = host_config.get("collect_max_files") or DEFAULT_MAX_FILES
+        max_bytes = host_config.get("collect_max_bytes") or DEFAULT_MAX_BYTES
+        manifest: Dict[str, Any] = {"dir": str(host_dir), "files": [], "bytes": 0}
+
+        host_dir.mkdir(parents=True, exist_ok=True)
+        state = _load_state(host_dir)
+        kept_files = 0
+        kept_bytes = 0
+        sftp = ssh.open_sftp()
+        try:
+            for remote_path, attrs, error in self._expand(sftp, self.paths_for(host_config)):
+                if deadline:
+                    deadline.check()
+                entry: Dict[str, Any] = {"remote": remote_path, "status": "failed", "bytes": 0}
+                if error:
+                    entry["error"] = error
+                else:
+                    entry["size"] = attrs.st_size
+                    entry["mtime"] = int(attrs.st_mtime)
+                    if kept_files >= max_files:
+                        entry.update(status="skipped", reason=f"超过单机文件数上限 {max_files}")
+                    elif kept_bytes + attrs.st_size > max_bytes:
+                        entry.update(status="skipped", reason=f"超过单机字节上限 {max_bytes}")
+                    else:
+                        try:
+                            self._fetch(sftp, remote_path, attrs, host_dir, state, entry)
+                            kept_files += 1
+                            kept_bytes += attrs.st_size
+                        except Exception as exc:
+                            entry["error"] = str(exc)
+                            logger.error(
+                                "收集 %s:%s 失败: %s",
+                                host_config["host"],
+                                remote_path,
+                                exc,
+                                extra={"host": host_config["host"], "phase": "collect"},
+                            )
+                manifest["files"].append(entry)
+        finally:
+            sftp.close()
+            _save_state(host_dir, state)
+
+        manifest["bytes"] = sum(entry["bytes"] for entry in manifest["files"])
+        return manifest
+
+    def _expand(self, sftp, paths: List[str]) -> Iterator[Tuple[str, Any, Optional[str]]]:
+        """展开路径: 末级通配符或目录 → 其中的普通文件; 出错时返回错误描述."""
+        for path in paths:
+            directory, pattern = posixpath.split(path)
+            try:
+                if not GLOB_CHARS.search(pattern):
+                    attrs = sftp.stat(path)
+                    if stat.S_ISREG(attrs.st_mode):
+                        yield path, attrs, None
+                        continue
+                    if not stat.S_ISDIR(attrs.st_mode):
+                        yield path, None, "不是普通文件"
+                        continue
+                    directory, pattern = path, "*"
+                entries = sorted(sftp.listdir_attr(directory), key=lambda a: a.filename)
+            except OSError as exc:
+                yield path, None, str(exc)
+                continue
+            for attrs in entries:
+                # 远端返回的文件名不可信, 含路径分隔符或 ./.. 的一律拒绝
+                if "/" in attrs.filename or attrs.filename in {".", ".."}:
+                    yield posixpath.join(directory, attrs.filename), None, f"非法文件名 {attrs.filename!r}"
+                    continue
+                if stat.S_ISREG(attrs.st_mode) and fnmatch.fnmatchcase(attrs.filename, pattern):
+                    yield posixpath.join(directory, attrs.filename), attrs, None
+
+    def _fetch(self, sftp, remote_path: str, attrs, host_dir: Path, state: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        local = host_dir / remote_path.lstrip("/")
+        if self.compress:
+            local = local.with_name(local.name + ".gz")
+        try:
+            local.resolve().relative_to(host_dir.resolve())
+        except ValueError:
+            raise ValueError(f"本地路径 {local} 超出收集目录 {host_dir}")
+        part = local.with_name(local.name + ".part")
+        entry["local"] = str(local)
+        signature = {"size": attrs.st_size, "mtime": int(attrs.st_mtime)}
+
+        if state["files"].get(remote_path) == signature and local.exists():
+            entry["status"] = "unchanged"
+            return
+
+        offset = 0
+        if not self.compress and part.exists() and state["partial"].get(remote_path) == signature:
+            offset = min(part.stat().st_size, attrs.st_size)
+        local.parent.mkdir(parents=True, exist_ok=True)
+        # 先落盘 partial 记录, 进程中断后下次可按 size+mtime 续传
+        state["partial"][remote_path] = signature
+        _save_state(host_dir, state)
+
+        transferred = 0
+        opener = gzip.open if self.compress else open
+        with sftp.open(remote_path, "rb") as remote_fp:
+            if offset:
+                remote_fp.seek(offset)
+            remote_fp.prefetch(attrs.st_size, PREFETCH_REQUESTS)
+            with opener(part, "ab" if offset else "wb") as local_fp:
+                while True:
+                    chunk = remote_fp.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if self.limiter:
+                        self.limiter.consume(len(chunk))
+                    local_fp.write(chunk)
+                    transferred += len(chunk)
+
+        os.replace(part, local)
+        os.utime(local, (attrs.st_mtime, attrs.st_mtime))
+        state["partial"].pop(remote_path, None)
+        state["files"][remote_path] = signature
+        entry.update(status="resumed" if offset else "collected", bytes=transferred)
+        if offset:
+            entry["resumed_from"] = offset
+
+
+def _safe_name(name: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", name)
+    # "." / ".." 等以点开头的名字会指向上级目录或隐藏目录, 加前缀固定在 dest_dir 下
+    return f"_{safe}" if not safe or safe.startswith(".") else safe
+
+
+def _load_state(host_dir: Path) -> Dict[str, Any]:
+    state_file = host_dir / STATE_FILE
+    try:
+        with open(state_file, "r", encoding="utf-8") as fp:
+            state = json.load(fp)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("files", {})
+    state.setdefault("partial", {})
+    return state
+
+
+def _save_state(host_dir: Path, state: Dict[str, Any]) -> None:
+    state_file = host_dir / STATE_FILE
+    tmp_file = state_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as fp:
+        json.dump(state, fp, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, state_file)
@@ -0,0 +1,64 @@
+"""Run-wide deadline shared by every host session of one inspection run."""
+
+import threading
+import time
+from typing import Any, Optional, Set
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside a host session once the run deadline has expired."""
+
+
+class RunDeadline:
+    """Track live SSH sessions so an expired run can cancel them together."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self._cancelled = threading.Event()
+        self._sessions: Set[Any] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before expiry, None when the run has no deadline."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def clamp(self, timeout: float) -> float:
+        """把单次连接/命令超时收紧到剩余时间内, 至少保留 1 秒."""
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return min(timeout, max(remaining, 1.0))
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise DeadlineExceeded("run deadline exceeded")
+
+    def sleep(self, delay: float) -> None:
+        """Back off like time.sleep but wake up early when the run is cancelled."""
+        self._cancelled.wait(delay)
+        self.check()
+
+    def register(self, session: Any) -> None:
+        with self._lock:
+            self.check()
+            self._sessions.add(session)
+
+    def unregister(self, session: Any) -> None:
+        with self._lock:
+            self._sessions.discard(session)
+
+    def cancel(self) -> int:
+        """Mark the run cancelled and abort every live session; returns how many."""
+        with self._lock:
+            self._cancelled.set()
+            sessions = list(self._sessions)
+        for session in sessions:
+            session.abort()
+        return len(sessions)
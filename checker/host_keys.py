@@ -0,0 +1,173 @@
+"""Process-wide known_hosts store shared by every SSH session of a run.
+
+known_hosts is parsed once per file and indexed: plain hostnames by name,
+hashed (``|1|salt|hmac``) entries by salt then HMAC digest, so a lookup costs
+one dict probe plus one HMAC per distinct salt. Keys learned under the TOFU
+policy are queued and appended in one batch by ``flush_host_key_stores``, all
+hashed with the store's single salt so they stay in one index bucket.
+"""
+
+import base64
+import hmac
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import paramiko
+from paramiko.hostkeys import HostKeyEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KNOWN_HOSTS = "~/.ssh/known_hosts"
+
+_stores: Dict[Path, "HostKeyStore"] = {}
+_stores_lock = threading.Lock()
+
+
+class UnknownHostKeyError(paramiko.SSHException):
+    """strict 策略下主机密钥不在 known_hosts 中; 重试也不会改变结果."""
+
+
+def host_key_name(host: str, port: int = 22) -> str:
+    """known_hosts 中的主机名写法, 与 paramiko 校验时使用的一致."""
+    return host if port == 22 else f"[{host}]:{port}"
+
+
+class HostKeyStore:
+    """Indexed, thread-safe view of one known_hosts file plus pending TOFU keys."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_KNOWN_HOSTS):
+        self.path = Path(path).expanduser()
+        self._plain: Dict[str, List[Tuple[str, str]]] = {}
+        self._hashed: Dict[bytes, Dict[bytes, List[Tuple[str, str]]]] = {}
+        self._resolved: Dict[str, List[paramiko.PKey]] = {}
+        self._pending: Dict[Tuple[str, str], paramiko.PKey] = {}
+        self._salt = os.urandom(20)
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        entries = 0
+        with open(self.path, "r", encoding="utf-8", errors="replace") as fp:
+            for line in fp:
+                fields = line.split()
+                # 跳过注释、@cert-authority/@revoked 标记行和残缺行
+                if len(fields) < 3 or fields[0].startswith(("#", "@")):
+                    continue
+                names, key_type, key_b64 = fields[:3]
+                for name in names.split(","):
+                    self._index(name, (key_type, key_b64))
+                entries += 1
+        logger.info("Loaded %d known_hosts entries from %s", entries, self.path)
+
+    def _index(self, name: str, key: Tuple[str, str]) -> None:
+        if name.startswith("|1|"):
+            try:
+                _, _, salt_b64, digest_b64 = name.split("|")
+                salt, digest = base64.b64decode(salt_b64), base64.b64decode(digest_b64)
+            except ValueError:
+                return
+            self._hashed.setdefault(salt, {}).setdefault(digest, []).append(key)
+        elif not any(ch in name for ch in "*?!"):
+            # 通配符/否定模式不建索引
+            self._plain.setdefault(name, []).append(key)
+
+    def lookup(self, hostname: str) -> List[paramiko.PKey]:
+        """Return every known key for hostname (plain, hashed or learned this run)."""
+        cached = self._resolved.get(hostname)
+        if cached is not None:
+            return cached
+        raw = list(self._plain.get(hostname, []))
+        encoded = hostname.encode("utf-8")
+        for salt, table in self._hashed.items():
+            raw.extend(table.get(hmac.digest(salt, encoded, "sha1"), []))
+
+        keys = []
+        for key_type, key_b64 in raw:
+            entry = HostKeyEntry.from_line(f"{hostname} {key_type} {key_b64}")
+            if entry is not None and entry.key is not None:
+                keys.append(entry.key)
+        with self._lock:
+            self._resolved[hostname] = keys
+        return keys
+
+    def remember(self, hostname: str, key: paramiko.PKey) -> None:
+        """Trust a first-seen key for the rest of the run and queue it for persistence."""
+        with self._lock:
+            self._pending[(hostname, key.get_name())] = key
+            self._plain.setdefault(hostname, []).append((key.get_name(), key.get_base64()))
+            self._resolved.pop(hostname, None)
+
+    def flush(self) -> int:
+        """Append queued keys to the file in one write; returns how many were written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        salt_b64 = base64.b64encode(self._salt).decode("ascii")
+        lines = []
+        for (hostname, key_type), key in pending.items():
+            digest = hmac.digest(self._salt, hostname.encode("utf-8"), "sha1")
+            hashed = f"|1|{salt_b64}|{base64.b64encode(digest).decode('ascii')}"
+            lines.append(f"{hashed} {key_type} {key.get_base64()}\n")
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
+            with os.fdopen(fd, "a+b") as fp:
+                # 手工编辑过的文件可能缺少结尾换行, 直接追加会和最后一行粘在一起
+                if fp.seek(0, os.SEEK_END):
+                    fp.seek(-1, os.SEEK_END)
+                    if fp.read(1) != b"\n":
+                        fp.write(b"\n")
+                fp.write("".join(lines).encode("utf-8"))
+        except OSError:
+            # 写失败时放回队列, 下次 flush 重试
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+        logger.info("Persisted %d new host keys to %s", len(lines), self.path)
+        return len(lines)
+
+
+class StoreHostKeyPolicy(paramiko.MissingHostKeyPolicy):
+    """strict: 拒绝未知主机; tofu: 首次信任并记入 store."""
+
+    def __init__(self, store: HostKeyStore, policy: str):
+        self.store = store
+        self.policy = policy
+
+    def missing_host_key(self, client, hostname, key):
+        if self.policy == "strict":
+            raise UnknownHostKeyError(f"{hostname} 的主机密钥不在 {self.store.path} 中 (strict)")
+        self.store.remember(hostname, key)
+        logger.info("TOFU: 记录 %s 的 %s 主机密钥", hostname, key.get_name(), extra={"host": hostname, "phase": "connect"})
+
+
+def get_host_key_store(path: Union[str, Path] = DEFAULT_KNOWN_HOSTS) -> HostKeyStore:
+    """Return the process-wide store for path, loading the file on first use only."""
+    resolved = Path(path).expanduser().resolve()
+    with _stores_lock:
+        store = _stores.get(resolved)
+        if store is None:
+            store = _stores[resolved] = HostKeyStore(resolved)
+        return store
+
+
+def flush_host_key_stores() -> int:
+    """Persist pending TOFU keys of every store; called at the end of a run.
+
+    截止时间触发时, 被中断的会话收尾后还会再调用一次, 补写它们学到的密钥.
+    """
+    with _stores_lock:
+        stores = list(_stores.values())
+    written = 0
+    for store in stores:
+        try:
+            written += store.flush()
+        except OSError as exc:
+            logger.warning("写入 known_hosts %s 失败: %s", store.path, exc)
+    return written
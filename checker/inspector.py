@@ -1,19 +1,25 @@
 """Concurrent SSH inspection orchestration and alert parsing."""
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
 from datetime import datetime
 import logging
 import re
+import threading
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
 
 import paramiko
 
+from .collector import FileCollector
+from .deadline import DeadlineExceeded, RunDeadline
+from .host_keys import UnknownHostKeyError, flush_host_key_stores
+from .output_store import OutputStore
+from .scheduling import DurationStore, estimate_makespan, order_hosts
+from .selection import DEFAULT_COMMANDS, filter_hosts, planned_commands
 from .ssh_client import SSHClient
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_COMMANDS = ["uptime"]
 RETRY_ATTEMPTS = 2
 RETRY_BASE_DELAY = 0.5
 DEFAULT_MEM_THRESHOLD = 80
@@ -24,36 +30,34 @@ LOAD_MULTIPLIER = 1.5
 def inspect_single_host(
     host_config: Dict[str, Any],
     default_commands: List[str],
+    deadline: Optional[RunDeadline] = None,
+    collector: Optional[FileCollector] = None,
 ) -> Dict[str, Any]:
     """Run the inspection flow for a single host (connect→exec→收集结果)."""
     ssh = SSHClient(host_config)
-    result = {
-        "name": host_config.get("name", host_config["host"]),
-        "host": host_config["host"],
-        "status": "failed",
-        "error": "",
-        "errors": [],
-        "alerts": [],
-        "checks": {},
-        "timestamp": datetime.now().isoformat(),
-        "duration": 0.0,
-    }
+    result = _new_result(host_config)
 
     start = time.perf_counter()
-    commands_to_run = default_commands + host_config.get("commands", [])
+    commands_to_run = planned_commands(host_config, default_commands)
     # allow None from config -> fallback
     retries = host_config.get("retries") or RETRY_ATTEMPTS
     command_timeout = host_config.get("command_timeout", ssh.command_timeout)
 
     try:
-        connect_with_retry(ssh, retries=retries)
+        if deadline:
+            deadline.register(ssh)
+            ssh.timeout = deadline.clamp(ssh.timeout)
+        connect_with_retry(ssh, retries=retries, deadline=deadline)
         for cmd in commands_to_run:
+            if deadline:
+                deadline.check()
             try:
                 output = exec_with_retry(
                     ssh,
                     cmd,
                     retries=retries,
-                    timeout=command_timeout,
+                    timeout=deadline.clamp(command_timeout) if deadline else command_timeout,
+                    deadline=deadline,
                 )
                 result["checks"][cmd] = output
                 alerts = collect_alerts(cmd, output, host_config)
@@ -61,60 +65,144 @@ def inspect_single_host(
                     result["alerts"].extend(alerts)
                     # 兼容旧字段
                     result.setdefault("alert", alerts[0])
+            except DeadlineExceeded:
+                raise
             except Exception as cmd_err:
                 message = f"{result['name']} 命令 {cmd} 失败: {cmd_err}"
                 result["errors"].append(message)
-                logger.error(message)
+                logger.error(message, extra=_log_extra(host_config["host"], "exec"))
+
+        if collector and collector.paths_for(host_config):
+            _collect_files(ssh, host_config, collector, result, deadline)
 
         if not result["errors"]:
             result["status"] = "success"
         else:
             result["error"] = "; ".join(result["errors"])
+    except DeadlineExceeded as exc:
+        result["status"] = "timeout"
+        result["error"] = f"{result['name']} 超出巡检截止时间: {exc}"
+        result["errors"].append(result["error"])
+        logger.warning(result["error"], extra=_log_extra(host_config["host"], "deadline"))
+    except (paramiko.BadHostKeyException, UnknownHostKeyError) as key_err:
+        msg = f"{result['name']} 主机密钥校验失败: {key_err}"
+        result["errors"].append(msg)
+        result["error"] = msg
+        logger.error(msg, extra=_log_extra(host_config["host"], "connect"))
     except paramiko.AuthenticationException as auth_err:
         msg = f"{result['name']} 认证失败: {auth_err}"
         result["errors"].append(msg)
         result["error"] = msg
-        logger.error(msg)
+        logger.error(msg, extra=_log_extra(host_config["host"], "connect"))
     except paramiko.SSHException as ssh_err:
         msg = f"{result['name']} SSH 异常: {ssh_err}"
         result["errors"].append(msg)
         result["error"] = msg
-        logger.error(msg)
+        logger.error(msg, extra=_log_extra(host_config["host"], "connect"))
     except Exception as exc:
         msg = f"{result['name']} 未知错误: {exc}"
         result["errors"].append(msg)
         result["error"] = msg
-        logger.exception(msg)
+        logger.exception(msg, extra=_log_extra(host_config["host"], "inspect"))
     finally:
+        if deadline:
+            deadline.unregister(ssh)
         ssh.close()
         result["duration"] = round(time.perf_counter() - start, 3)
-        logger.info("→ %s: %s (%.3fs)", result["name"], result["status"], result["duration"])
+        logger.info(
+            "→ %s: %s (%.3fs)",
+            result["name"],
+            result["status"],
+            result["duration"],
+            extra=_log_extra(host_config["host"], "done"),
+        )
 
     return result
 
 
-def connect_with_retry(ssh: SSHClient, retries: int = RETRY_ATTEMPTS) -> None:
-    """Try establishing SSH connection with轻量重试,认证失败不重试."""
+def _log_extra(host: str, phase: str) -> Dict[str, str]:
+    """结构化日志字段, JSON 格式输出与按主机采样都依赖它."""
+    return {"host": host, "phase": phase}
+
+
+def _new_result(host_config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "name": host_config.get("name", host_config["host"]),
+        "host": host_config["host"],
+        "status": "failed",
+        "error": "",
+        "errors": [],
+        "alerts": [],
+        "checks": {},
+        "timestamp": datetime.now().isoformat(),
+        "duration": 0.0,
+    }
+
+
+def _collect_files(
+    ssh: SSHClient,
+    host_config: Dict[str, Any],
+    collector: FileCollector,
+    result: Dict[str, Any],
+    deadline: Optional[RunDeadline],
+) -> None:
+    """Run SFTP collection and fold per-file failures into result errors."""
+    try:
+        manifest = collector.collect(ssh, host_config, deadline=deadline)
+    except DeadlineExceeded:
+        raise
+    except Exception as exc:
+        message = f"{result['name']} 文件收集失败: {exc}"
+        result["errors"].append(message)
+        logger.error(message, extra=_log_extra(host_config["host"], "collect"))
+        return
+    result["collected"] = manifest
+    for entry in manifest["files"]:
+        if entry["status"] == "failed":
+            result["errors"].append(f"{result['name']} 收集 {entry['remote']} 失败: {entry['error']}")
+
+
+def _backoff(delay: float, deadline: Optional[RunDeadline]) -> None:
+    if deadline:
+        deadline.sleep(delay)
+    else:
+        time.sleep(delay)
+
+
+def connect_with_retry(
+    ssh: SSHClient,
+    retries: int = RETRY_ATTEMPTS,
+    deadline: Optional[RunDeadline] = None,
+) -> None:
+    """Try establishing SSH connection with轻量重试,认证失败/主机密钥被拒不重试."""
     delay = RETRY_BASE_DELAY
     last_exc: Optional[Exception] = None
     for attempt in range(1, retries + 1):
         try:
             ssh.connect()
             return
-        except paramiko.AuthenticationException:
+        except (paramiko.AuthenticationException, paramiko.BadHostKeyException, UnknownHostKeyError):
             raise
         except Exception as exc:
+            if deadline:
+                deadline.check()
             last_exc = exc
-            logger.warning("连接失败(第 %s 次): %s", attempt, exc)
+            logger.warning("连接失败(第 %s 次): %s", attempt, exc, extra=_log_extra(ssh.host, "connect"))
             if attempt < retries:
-                time.sleep(delay)
+                _backoff(delay, deadline)
                 delay *= 2
     if last_exc:
         raise paramiko.SSHException(last_exc)
     raise paramiko.SSHException("连接失败且无异常信息")
 
 
-def exec_with_retry(ssh: SSHClient, command: str, retries: int, timeout: float) -> str:
+def exec_with_retry(
+    ssh: SSHClient,
+    command: str,
+    retries: int,
+    timeout: float,
+    deadline: Optional[RunDeadline] = None,
+) -> str:
     """执行命令并重试 SSHException, 每次延迟翻倍."""
     delay = RETRY_BASE_DELAY
     last_exc: Optional[Exception] = None
@@ -122,10 +210,14 @@ def exec_with_retry(ssh: SSHClient, command: str, retries: int, timeout: float)
         try:
             return ssh.exec_command(command, timeout=timeout)
         except paramiko.SSHException as exc:
+            if deadline:
+                deadline.check()
             last_exc = exc
-            logger.warning("%s 失败(第 %s 次): %s", command, attempt, exc)
+            logger.warning(
+                "%s 失败(第 %s 次): %s", command, attempt, exc, extra=_log_extra(ssh.host, "exec")
+            )
             if attempt < retries:
-                time.sleep(delay)
+                _backoff(delay, deadline)
                 delay *= 2
     raise paramiko.SSHException(last_exc or "command execution failed")
 
@@ -135,41 +227,132 @@ def inspect_hosts(
     tags_filter: Optional[Dict[str, str]] = None,
     commands: List[str] = None,
     max_workers: int = 5,
+    deadline: Optional[float] = None,
+    duration_store: Optional[DurationStore] = None,
+    collector: Optional[FileCollector] = None,
 ) -> List[Dict[str, Any]]:
-    """Filter hosts by tag and run inspect_single_host concurrently."""
-    default_commands = DEFAULT_COMMANDS if not commands else commands
+    """Filter hosts by tag and run inspect_single_host concurrently.
 
-    filtered_hosts = []
-    for host_config in hosts:
-        if tags_filter and not all(
-            host_config.get("tags", {}).get(k) == v for k, v in tags_filter.items()
-        ):
-            logger.info(
-                "Skipping %s (tag mismatch)",
-                host_config.get("name", host_config["host"]),
-            )
-            continue
-        filtered_hosts.append(host_config)
+    deadline 为整次巡检的秒数上限: 到期后关闭仍在进行的 SSH 会话,
+    未完成主机记为 timeout 并立即返回已有结果.
+    传入 duration_store 时按历史耗时从慢到快提交, 并在结束后写回本次耗时.
+    传入 collector 时在命令执行后通过同一连接 SFTP 拉取文件.
+    """
+    default_commands = DEFAULT_COMMANDS if not commands else commands
 
+    filtered_hosts = filter_hosts(hosts, tags_filter)
     if not filtered_hosts:
         logger.warning("无匹配主机，巡检中止")
         return []
 
+    predictions: Dict[str, Optional[float]] = {}
+    low_priority: Set[str] = set()
+    planned: Dict[str, float] = {}
+    if duration_store is not None:
+        inventory_order = filtered_hosts
+        filtered_hosts, predictions, low_priority = order_hosts(filtered_hosts, duration_store)
+        planned = {
+            "predicted_wall_time_inventory": estimate_makespan(inventory_order, predictions, max_workers),
+            "predicted_wall_time_scheduled": estimate_makespan(filtered_hosts, predictions, max_workers),
+        }
+
     results = []
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    # 同一次巡检内相同输出只保留一份, 大规模同构主机时显著省内存
+    output_store = OutputStore()
+    run_deadline = RunDeadline(deadline)
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
         future_map = {
-            executor.submit(inspect_single_host, host_config, default_commands): host_config
+            executor.submit(
+                inspect_single_host,
+                host_config,
+                default_commands,
+                deadline=run_deadline,
+                collector=collector,
+            ): host_config
             for host_config in filtered_hosts
         }
-        for future in as_completed(future_map):
-            try:
-                results.append(future.result())
-            except Exception as exc:
-                logger.exception("巡检任务异常: %s", exc)
+        pending = set(future_map)
+        try:
+            for future in as_completed(future_map, timeout=run_deadline.remaining()):
+                pending.discard(future)
+                try:
+                    results.append(output_store.intern_checks(future.result()))
+                except Exception as exc:
+                    logger.exception("巡检任务异常: %s", exc)
+        except FuturesTimeout:
+            aborted = run_deadline.cancel()
+            logger.warning(
+                "巡检超出截止时间 %ss: %d 台主机未完成, 已中断 %d 个会话",
+                deadline,
+                len(pending),
+                aborted,
+            )
+            elapsed = round(time.perf_counter() - start, 3)
+            for future in pending:
+                # cancel() 成功说明任务还在队列里, 主机根本没有开始巡检
+                started = not future.cancel()
+                results.append(_timeout_result(future_map[future], elapsed, started=started))
+    finally:
+        # 超时后不等待被中断的线程收尾, 报告可以立即生成
+        executor.shutdown(wait=not run_deadline.cancelled, cancel_futures=True)
+        if run_deadline.cancelled:
+            # 被中断的会话收尾前仍可能学到新密钥; 非 daemon 线程保证进程退出前补写
+            threading.Thread(target=_flush_after_shutdown, args=(executor,), name="host-key-flush").start()
+
+    # TOFU 新学到的主机密钥在整次巡检结束后一次性写回
+    flush_host_key_stores()
 
+    if duration_store is not None:
+        planned["wall_time"] = round(time.perf_counter() - start, 3)
+        _record_schedule(results, duration_store, predictions, low_priority, planned)
+
+    logger.debug("Interned %d outputs into %d unique blobs", output_store.total, len(output_store))
     return results
 
 
+def _flush_after_shutdown(executor: ThreadPoolExecutor) -> None:
+    executor.shutdown(wait=True)
+    flush_host_key_stores()
+
+
+def _record_schedule(
+    results: List[Dict[str, Any]],
+    duration_store: DurationStore,
+    predictions: Dict[str, Optional[float]],
+    low_priority: Set[str],
+    run_stats: Dict[str, float],
+) -> None:
+    """Attach predicted durations to results and fold actual durations back into history.
+
+    run_stats (实际/预测墙钟时间) 挂在 duration_store.last_run 上, 由调用方并入报告.
+    """
+    for result in results:
+        result["predicted_duration"] = predictions.get(result["host"])
+        result["schedule_lane"] = "low" if result["host"] in low_priority else "normal"
+    duration_store.last_run = run_stats
+    duration_store.update(results)
+    try:
+        duration_store.save()
+    except OSError as exc:
+        logger.warning("耗时历史写入失败 %s: %s", duration_store.path, exc)
+
+
+def _timeout_result(host_config: Dict[str, Any], elapsed: float, started: bool = True) -> Dict[str, Any]:
+    result = _new_result(host_config)
+    result["status"] = "timeout"
+    if started:
+        result["error"] = f"{result['name']} 超出巡检截止时间, 结果未完成"
+    else:
+        # 未开始的主机不计入耗时历史, 以免下次被当作失败主机排到最后
+        result["error"] = f"{result['name']} 超出巡检截止时间, 未开始巡检"
+        result["not_started"] = True
+    result["errors"].append(result["error"])
+    result["duration"] = elapsed
+    return result
+
+
 def collect_alerts(command: str, output: str, host_config: Dict[str, Any]) -> List[str]:
     """Dispatch to对应解析器, 聚合磁盘/内存/负载告警."""
     alerts = []
@@ -178,13 +361,13 @@ def collect_alerts(command: str, output: str, host_config: Dict[str, Any]) -> Li
         alert = parse_disk_alert(output, threshold=disk_threshold)
         if alert:
             alerts.append(alert)
-            logger.warning("WARNING: %s", alert)
+            logger.warning("WARNING: %s", alert, extra=_log_extra(host_config["host"], "alert"))
     if command in {"free -m", "free -h"}:
         mem_threshold = host_config.get("memory_threshold") or DEFAULT_MEM_THRESHOLD
         alert = parse_memory_alert(output, threshold=mem_threshold)
         if alert:
             alerts.append(alert)
-            logger.warning("WARNING: %s", alert)
+            logger.warning("WARNING: %s", alert, extra=_log_extra(host_config["host"], "alert"))
     if command == "uptime":
         cpu_cores = host_config.get("cpu_cores") or 1
         load_multiplier = host_config.get("load_multiplier") or LOAD_MULTIPLIER
@@ -195,7 +378,7 @@ def collect_alerts(command: str, output: str, host_config: Dict[str, Any]) -> Li
         )
         if alert:
             alerts.append(alert)
-            logger.warning("WARNING: %s", alert)
+            logger.warning("WARNING: %s", alert, extra=_log_extra(host_config["host"], "alert"))
     return alerts
 
 
@@ -0,0 +1,37 @@
+"""Content-addressed store that interns identical command outputs across hosts."""
+
+import hashlib
+import threading
+from typing import Any, Dict
+
+
+def output_digest(output: str) -> str:
+    """Return the sha256 hex digest used as the blob key for an output."""
+    return hashlib.sha256(output.encode("utf-8")).hexdigest()
+
+
+class OutputStore:
+    """Keep one copy per unique output; safe to share across worker threads."""
+
+    def __init__(self):
+        self._blobs: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def intern(self, output: str) -> str:
+        """返回已存储的同内容字符串，使相同输出在内存中只保留一份."""
+        digest = output_digest(output)
+        with self._lock:
+            self.total += 1
+            return self._blobs.setdefault(digest, output)
+
+    def intern_checks(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Replace every output in result["checks"] with its interned copy."""
+        checks = result.get("checks") or {}
+        for cmd, output in checks.items():
+            if isinstance(output, str):
+                checks[cmd] = self.intern(output)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._blobs)
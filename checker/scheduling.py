@@ -0,0 +1,190 @@
+"""History-aware submission order: slowest hosts first, recent failures last."""
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_PATH = Path("reports") / "durations.json"
+EWMA_ALPHA = 0.5
+RECENT_FAILURE_WINDOW = 24 * 3600
+FAILED_STATUSES = {"failed", "timeout"}
+
+# 同进程内并发巡检共享一把锁, 保存时重新读取磁盘再合并, 避免互相覆盖
+_SAVE_LOCK = threading.Lock()
+
+
+class DurationStore:
+    """Small JSON store of per-host duration history (EWMA) and last status."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_STORE_PATH, report_dir: Union[str, Path, None] = None):
+        self.path = Path(path)
+        self.report_dir = Path(report_dir) if report_dir else self.path.parent
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.last_run: Dict[str, Any] = {}
+        self._loaded = False
+        self._pending: List[Tuple[str, float, Optional[str], float]] = []
+
+    def load(self) -> "DurationStore":
+        """读取历史; 首次使用时退回到最近一份报告做冷启动."""
+        if self._loaded:
+            return self
+        self._loaded = True
+        if self.path.exists():
+            try:
+                self.entries = self._read()
+                return self
+            except (OSError, ValueError) as exc:
+                logger.warning("耗时历史 %s 读取失败, 忽略: %s", self.path, exc)
+        self._seed_from_latest_report()
+        return self
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        with open(self.path, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+
+    def _seed_from_latest_report(self) -> None:
+        reports = sorted(self.report_dir.glob("report_*.json"), reverse=True)
+        if not reports:
+            return
+        try:
+            with open(reports[0], "r", encoding="utf-8") as fp:
+                results = json.load(fp).get("results", [])
+        except (OSError, ValueError) as exc:
+            logger.warning("无法从报告 %s 获取历史耗时: %s", reports[0], exc)
+            return
+        now = reports[0].stat().st_mtime
+        for host, duration, status in _observations(results):
+            _fold(self.entries, host, duration, status, now)
+
+    def predict(self, host: str) -> Optional[float]:
+        entry = self.entries.get(host)
+        return entry.get("duration") if entry else None
+
+    def recently_failed(self, host: str, now: Optional[float] = None) -> bool:
+        entry = self.entries.get(host)
+        if not entry or entry.get("last_status") not in FAILED_STATUSES:
+            return False
+        now = time.time() if now is None else now
+        return now - entry.get("updated_at", 0) < RECENT_FAILURE_WINDOW
+
+    def update(self, results: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """Fold one run's durations into the EWMA and remember each host's status.
+
+        只有 success 的耗时进入 EWMA; 失败/超时的耗时反映的是重试或截止时间,
+        只更新 last_status/updated_at.
+        """
+        now = time.time() if now is None else now
+        for host, duration, status in _observations(results):
+            _fold(self.entries, host, duration, status, now)
+            self._pending.append((host, duration, status, now))
+
+    def save(self) -> None:
+        """Write history back, re-applying this run's updates on top of the latest file.
+
+        其他巡检可能在本次 load 之后已经写过历史, 因此在锁内重新读取磁盘版本,
+        把尚未保存的观测重新折叠进去再原子替换, 不会丢掉别人的更新.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with _SAVE_LOCK:
+            entries = self.entries
+            if self.path.exists():
+                try:
+                    entries = self._read()
+                except (OSError, ValueError) as exc:
+                    logger.warning("耗时历史 %s 读取失败, 覆盖写入: %s", self.path, exc)
+                else:
+                    for host, duration, status, now in self._pending:
+                        _fold(entries, host, duration, status, now)
+            # 临时文件按进程/线程区分, 跨进程并发保存也不会写坏同一个文件
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as fp:
+                json.dump(entries, fp, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        self.entries = entries
+        self._pending = []
+
+
+def _observations(results: List[Dict[str, Any]]) -> List[Tuple[str, float, Optional[str]]]:
+    # not_started: 截止时间到期时仍在队列中或未派发的主机, 没有可用的耗时和状态
+    return [
+        (r["host"], r["duration"], r.get("status"))
+        for r in results
+        if r.get("host") and r.get("duration") is not None and not r.get("not_started")
+    ]
+
+
+def _fold(
+    entries: Dict[str, Dict[str, Any]],
+    host: str,
+    duration: float,
+    status: Optional[str],
+    now: float,
+) -> None:
+    entry = dict(entries.get(host) or {})
+    previous = entry.get("duration")
+    if status == "success":
+        if previous is not None:
+            duration = EWMA_ALPHA * duration + (1 - EWMA_ALPHA) * previous
+        entry["duration"] = round(duration, 3)
+    else:
+        entry.setdefault("duration", None)
+    entry["last_status"] = status
+    entry["updated_at"] = now
+    entries[host] = entry
+
+
+def order_hosts(
+    hosts: List[dict],
+    store: DurationStore,
+) -> Tuple[List[dict], Dict[str, Optional[float]], Set[str]]:
+    """Return submission order, per-host predictions and the low-priority host set.
+
+    正常主机按预测耗时降序 (LPT), 无历史的主机按已知中位数估计;
+    近期失败/超时的主机放到末尾的低优先级通道.
+    """
+    store.load()
+    predictions = {h["host"]: store.predict(h["host"]) for h in hosts}
+
+    now = time.time()
+    normal, low_priority = [], []
+    for host_config in hosts:
+        lane = low_priority if store.recently_failed(host_config["host"], now) else normal
+        lane.append(host_config)
+
+    known = [predictions[h["host"]] for h in normal if predictions[h["host"]] is not None]
+    fallback = median(known) if known else 0.0
+
+    def sort_key(host_config: dict) -> Tuple[float, bool]:
+        predicted = predictions[host_config["host"]]
+        return -(predicted if predicted is not None else fallback), predicted is None
+
+    # sorted 是稳定排序, 同等预测下有历史的主机优先, 其余保持清单顺序
+    ordered = sorted(normal, key=sort_key) + sorted(low_priority, key=sort_key)
+    if low_priority:
+        logger.info("%d 台近期失败主机进入低优先级通道", len(low_priority))
+    return ordered, predictions, {h["host"] for h in low_priority}
+
+
+def estimate_makespan(hosts: List[dict], predictions: Dict[str, Optional[float]], max_workers: int) -> float:
+    """按给定提交顺序模拟线程池贪心分配, 返回预测的整次巡检耗时.
+
+    无历史主机按已知预测的中位数估计, 与 order_hosts 的排序假设一致.
+    """
+    if not hosts:
+        return 0.0
+    known = [p for p in predictions.values() if p is not None]
+    fallback = median(known) if known else 0.0
+    finish_times = [0.0] * max(1, min(max_workers, len(hosts)))
+    for host_config in hosts:
+        predicted = predictions.get(host_config["host"])
+        earliest = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, earliest + (predicted if predicted is not None else fallback))
+    return round(max(finish_times), 3)
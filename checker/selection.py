@@ -0,0 +1,32 @@
+"""Host selection helpers kept free of paramiko so dry runs stay cheap to import."""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMMANDS = ["uptime"]
+
+
+def filter_hosts(
+    hosts: List[dict],
+    tags_filter: Optional[Dict[str, str]] = None,
+) -> List[dict]:
+    """Return hosts whose tags match every k=v pair in tags_filter."""
+    filtered_hosts = []
+    for host_config in hosts:
+        if tags_filter and not all(
+            host_config.get("tags", {}).get(k) == v for k, v in tags_filter.items()
+        ):
+            logger.info(
+                "Skipping %s (tag mismatch)",
+                host_config.get("name", host_config["host"]),
+            )
+            continue
+        filtered_hosts.append(host_config)
+    return filtered_hosts
+
+
+def planned_commands(host_config: Dict[str, Any], default_commands: List[str]) -> List[str]:
+    """默认命令 + 主机自定义命令, 与 inspect_single_host 的执行顺序一致."""
+    return default_commands + host_config.get("commands", [])
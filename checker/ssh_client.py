@@ -6,6 +6,8 @@ from typing import Optional
 
 import paramiko
 
+from .host_keys import DEFAULT_KNOWN_HOSTS, StoreHostKeyPolicy, get_host_key_store, host_key_name
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,12 +25,14 @@ class SSHClient:
         self.password = host_config.get("password")
         self.timeout = host_config.get("timeout", timeout)
         self.command_timeout = host_config.get("command_timeout", 10)
+        self.host_key_policy = host_config.get("host_key_policy") or "tofu"
+        self.known_hosts = host_config.get("known_hosts") or DEFAULT_KNOWN_HOSTS
         self.client = None
 
     def connect(self) -> bool:
         """建立 SSH 连接，优先用密钥，退回密码."""
         self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._apply_host_key_policy()
 
         if self.key_path and Path(self.key_path).exists():
             pkey = self._load_private_key(self.key_path)
@@ -52,9 +56,23 @@ class SSHClient:
         else:
             raise ValueError("No key or password provided")
 
-        logger.info("Connected to %s:%s", self.host, self.port)
+        logger.info(
+            "Connected to %s:%s", self.host, self.port, extra={"host": self.host, "phase": "connect"}
+        )
         return True
 
+    def _apply_host_key_policy(self) -> None:
+        """只把本主机的已知密钥放进 paramiko, 避免每次连接重新解析 known_hosts."""
+        if self.host_key_policy == "off":
+            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            return
+        store = get_host_key_store(self.known_hosts)
+        name = host_key_name(self.host, self.port)
+        host_keys = self.client.get_host_keys()
+        for key in store.lookup(name):
+            host_keys.add(name, key.get_name(), key)
+        self.client.set_missing_host_key_policy(StoreHostKeyPolicy(store, self.host_key_policy))
+
     @staticmethod
     def _load_private_key(path: str):
         """支持 RSA/Ed25519 私钥，优先尝试 RSA 后回退 Ed25519."""
@@ -80,6 +98,19 @@ class SSHClient:
         error = stderr.read().decode().strip()
         return output if not error else f"ERROR: {error}"
 
+    def open_sftp(self):
+        """在已建立的连接上打开 SFTP 会话, 复用同一 transport."""
+        if not self.client:
+            raise RuntimeError("SSH client is not connected")
+        return self.client.open_sftp()
+
+    def abort(self) -> None:
+        """从其他线程强制断开: 关闭 transport 让阻塞中的连接/读操作立即失败."""
+        client = self.client
+        transport = client.get_transport() if client else None
+        if transport:
+            transport.close()
+
     def close(self):
         """释放底层 Paramiko 连接."""
         if self.client:
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
@@ -22,8 +22,15 @@ class Host(BaseModel):
     load_multiplier: Optional[float] = Field(default=None, gt=0)
     cpu_cores: Optional[int] = Field(default=None, ge=1)
     retries: Optional[int] = Field(default=None, ge=1)
-
-    @field_validator("commands")
+    collect: List[str] = Field(default_factory=list, description="remote files/globs pulled via SFTP")
+    collect_max_files: Optional[int] = Field(default=None, ge=1)
+    collect_max_bytes: Optional[int] = Field(default=None, ge=1)
+    host_key_policy: Literal["strict", "tofu", "off"] = Field(
+        default="tofu", description="strict: 仅接受 known_hosts 中的密钥; tofu: 首次信任并持久化; off: 不校验"
+    )
+    known_hosts: Optional[str] = Field(default=None, description="known_hosts path, defaults to ~/.ssh/known_hosts")
+
+    @field_validator("commands", "collect")
     @classmethod
     def strip_empty_commands(cls, value: List[str]) -> List[str]:
         return [cmd for cmd in value if cmd]
@@ -1,37 +1,130 @@
 import argparse
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import List, Optional
 
-from checker.inspector import inspect_hosts
-from config.loader import load_settings
-from reporter.reporter import generate_report
+# paramiko/pydantic 等重模块均在 main() 内按需导入, 保证 --help/--validate/--dry-run 启动迅速
 
+_log_listener: Optional[QueueListener] = None
+_log_options: Optional[tuple] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, carrying the host/phase fields from ``extra``."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "host": getattr(record, "host", None),
+            "phase": getattr(record, "phase", None),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class LocalQueueHandler(QueueHandler):
+    """QueueHandler for an in-process queue: keep exc_info for the listener's formatter.
+
+    默认 prepare() 会先用本 handler 的格式把异常拼进 msg 并清空 exc_info,
+    JsonFormatter 就拿不到 exc 字段; 队列只在进程内传递, 无需序列化.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class HostSampler(logging.Filter):
+    """Keep INFO/DEBUG records for a stable fraction of hosts; WARNING+ always pass."""
+
+    def __init__(self, rate: float):
+        if not 0 < rate <= 1:
+            raise ValueError(f"sample rate must be in (0, 1], got {rate}")
+        super().__init__()
+        self.threshold = int(rate * 10_000)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        host = getattr(record, "host", None)
+        if host is None or record.levelno >= logging.WARNING:
+            return True
+        # crc32 而非 hash(): 跨进程/多次运行采样到的是同一批主机
+        return zlib.crc32(host.encode("utf-8")) % 10_000 < self.threshold
+
+
+def setup_logging(level_name: str, json_format: bool = False, sample_rate: float = 1.0) -> None:
+    """Configure root logger so every模块共享统一格式/Handler.
+
+    业务线程只把 record 放进队列, 由单个 QueueListener 线程负责格式化与
+    终端/文件 I/O. 重复调用且选项不变时只调整级别, 不重建 handler.
+    """
+    global _log_listener, _log_options
+
+    logger = logging.getLogger()
+    logger.setLevel(getattr(logging, level_name.upper(), logging.INFO))
+    options = (json_format, sample_rate)
+    if _log_listener is not None and _log_options == options:
+        return
 
-def setup_logging(level_name: str) -> None:
-    """Configure root logger so every模块共享统一格式/Handler."""
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
     log_file = log_dir / "app.log"
 
-    logger = logging.getLogger()
-    logger.setLevel(getattr(logging, level_name.upper(), logging.INFO))
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    if json_format:
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
 
     # 清理旧 handler，避免重复输出
+    _stop_log_listener()
     for handler in list(logger.handlers):
         logger.removeHandler(handler)
 
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
 
     file_handler = RotatingFileHandler(log_file, maxBytes=1_000_000, backupCount=3, encoding="utf-8")
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = LocalQueueHandler(log_queue)
+    if sample_rate < 1.0:
+        queue_handler.addFilter(HostSampler(sample_rate))
+    logger.addHandler(queue_handler)
+
+    _log_listener = QueueListener(log_queue, stream_handler, file_handler)
+    _log_listener.start()
+    _log_options = options
+
+
+def _stop_log_listener() -> None:
+    """Flush queued records and stop the listener thread (also runs at exit)."""
+    global _log_listener, _log_options
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    for handler in _log_listener.handlers:
+        handler.close()
+    _log_listener = None
+    _log_options = None
+
+
+atexit.register(_stop_log_listener)
 
 
 def parse_tags(tags_arg: str) -> dict:
@@ -47,6 +140,21 @@ def parse_tags(tags_arg: str) -> dict:
     return tags_filter
 
 
+def print_host_plan(hosts: List[dict], commands: Optional[List[str]], show_commands: bool) -> None:
+    """Print the matched host set (and optionally planned commands) without SSH."""
+    from checker.selection import DEFAULT_COMMANDS, planned_commands
+
+    default_commands = commands or DEFAULT_COMMANDS
+    print(f"匹配主机 {len(hosts)} 台:")
+    for host_config in hosts:
+        name = host_config.get("name") or host_config["host"]
+        tags = ",".join(f"{k}={v}" for k, v in host_config.get("tags", {}).items())
+        print(f"  {name}\t{host_config['host']}:{host_config.get('port', 22)}\t{tags}")
+        if show_commands:
+            for cmd in planned_commands(host_config, default_commands):
+                print(f"    $ {cmd}")
+
+
 def main():
     """CLI entry: 解析参数→校验配置→并发巡检→生成报告。"""
     parser = argparse.ArgumentParser(description="批量主机巡检工具")
@@ -54,38 +162,117 @@ def main():
     parser.add_argument("--tags", help="过滤标签, e.g., env=prod,role=web")
     parser.add_argument("--commands", nargs="+", help="自定义命令列表")
     parser.add_argument("--max-workers", type=int, default=5, help="并发线程数，默认 5")
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="整次巡检的截止秒数，到期中断未完成主机并输出部分报告",
+    )
     parser.add_argument(
         "--log-level",
         default="INFO",
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
         help="日志级别，默认 INFO",
     )
+    parser.add_argument("--known-hosts", help="主机未配置 known_hosts 时使用的文件，默认 ~/.ssh/known_hosts")
+    parser.add_argument("--no-history", action="store_true", help="不按历史耗时排序提交主机")
+    parser.add_argument("--collect", nargs="+", help="通过 SFTP 收集的远程文件/通配符, e.g., /var/log/messages '/etc/nginx/*.conf'")
+    parser.add_argument("--collect-dir", default="collected", help="收集文件的本地目录，默认 collected/")
+    parser.add_argument("--collect-compress", action="store_true", help="收集时 gzip 压缩落盘")
+    parser.add_argument("--collect-bwlimit", type=float, help="收集总带宽上限 (KiB/s)，所有主机共享")
+    parser.add_argument("--workers", nargs="+", help="协调者模式: 把主机分片派发给这些 worker API, e.g., http://10.0.0.5:8080")
+    parser.add_argument("--shard-by", default="region", help="协调者模式下的分片标签，默认 region")
+    parser.add_argument("--log-json", action="store_true", help="日志输出为 JSON 行, 含 host/phase 字段")
+    parser.add_argument(
+        "--log-sample",
+        type=float,
+        default=1.0,
+        help="按主机采样 INFO/DEBUG 日志的比例 (0-1]，WARNING 及以上不采样，默认 1",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--validate", action="store_true", help="仅校验配置并列出匹配主机，不连接 SSH")
+    mode.add_argument("--dry-run", action="store_true", help="列出匹配主机及将执行的命令，不连接 SSH")
     args = parser.parse_args()
+    if args.deadline is not None and args.deadline <= 0:
+        parser.error("--deadline 必须大于 0")
+    if not 0 < args.log_sample <= 1:
+        parser.error("--log-sample 必须在 (0, 1] 范围内")
+    if args.workers and args.collect_dir != parser.get_default("collect_dir"):
+        parser.error("--collect-dir 不支持协调者模式: 文件由各 worker 收集到其本地 collected/")
 
-    setup_logging(args.log_level)
+    setup_logging(args.log_level, json_format=args.log_json, sample_rate=args.log_sample)
     logger = logging.getLogger(__name__)
-    logger.info("Starting batch inspection...")
+
+    from checker.selection import filter_hosts
+    from config.loader import load_settings
 
     settings = load_settings(args.hosts)
     hosts = [host.model_dump() for host in settings.hosts]
+    if args.known_hosts:
+        for host_config in hosts:
+            host_config["known_hosts"] = host_config["known_hosts"] or args.known_hosts
 
     tags_filter = parse_tags(args.tags)
 
-    results = inspect_hosts(
-        hosts,
-        tags_filter=tags_filter,
-        commands=args.commands,
-        max_workers=args.max_workers,
-    )
-    report_file = generate_report(results)
+    if args.validate or args.dry_run:
+        matched = filter_hosts(hosts, tags_filter)
+        if args.validate:
+            print(f"配置校验通过: {args.hosts} ({len(hosts)} 台主机)")
+        print_host_plan(matched, args.commands, show_commands=args.dry_run)
+        return
+
+    from reporter.reporter import generate_report
+
+    logger.info("Starting batch inspection...")
+    if args.workers:
+        from app.coordinator import coordinate
+
+        results, stats = coordinate(
+            filter_hosts(hosts, tags_filter),
+            args.workers,
+            commands=args.commands,
+            max_workers=args.max_workers,
+            deadline=args.deadline,
+            shard_by=args.shard_by,
+            use_history=not args.no_history,
+            collect=args.collect,
+            collect_compress=args.collect_compress,
+            collect_bwlimit=args.collect_bwlimit,
+        )
+        report_file = generate_report(results, summary_extra={"distributed": stats})
+    else:
+        from checker.collector import FileCollector
+        from checker.inspector import inspect_hosts
+        from checker.scheduling import DurationStore
+
+        duration_store = None if args.no_history else DurationStore()
+        results = inspect_hosts(
+            hosts,
+            tags_filter=tags_filter,
+            commands=args.commands,
+            max_workers=args.max_workers,
+            deadline=args.deadline,
+            duration_store=duration_store,
+            collector=FileCollector(
+                paths=args.collect,
+                dest_dir=args.collect_dir,
+                compress=args.collect_compress,
+                bwlimit=args.collect_bwlimit * 1024 if args.collect_bwlimit else None,
+            ),
+        )
+        report_file = generate_report(
+            results,
+            summary_extra={"scheduling": duration_store.last_run} if duration_store else None,
+        )
     success_hosts = len([r for r in results if r.get("status") == "success"])
     failed_hosts = len([r for r in results if r.get("status") == "failed"])
+    timeout_hosts = len([r for r in results if r.get("status") == "timeout"])
     total_alerts = sum(len(r.get("alerts", [])) for r in results)
     logger.info(
-        "Summary: total=%d success=%d failed=%d alerts=%d report=%s",
+        "Summary: total=%d success=%d failed=%d timeout=%d alerts=%d report=%s",
         len(results),
         success_hosts,
         failed_hosts,
+        timeout_hosts,
         total_alerts,
         report_file,
     )
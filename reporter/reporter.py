@@ -1,16 +1,22 @@
 import json
 import logging
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from checker.output_store import output_digest
 
 REPORT_DIR = Path("reports")
-REPORT_DIR.mkdir(exist_ok=True)
 logger = logging.getLogger(__name__)
 
 
-def generate_report(results: List[Dict], output_file: str = None) -> str:
-    """Persist JSON report并统计耗时/告警摘要."""
+def generate_report(
+    results: List[Dict],
+    output_file: str = None,
+    summary_extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Persist JSON report并统计耗时/告警摘要; summary_extra 合并进 summary (同名 dict 逐键合并)."""
     if not output_file:
         now = datetime.now()
         output_file = REPORT_DIR / f"report_{now.strftime('%Y%m%d_%H%M%S')}.json"
@@ -24,18 +30,50 @@ def generate_report(results: List[Dict], output_file: str = None) -> str:
         "total_hosts": len(results),
         "success_hosts": len([r for r in results if r.get("status") == "success"]),
         "failed_hosts": len([r for r in results if r.get("status") == "failed"]),
+        "timeout_hosts": len([r for r in results if r.get("status") == "timeout"]),
         "alerts": sum(len(r.get("alerts", [])) for r in results),
         "longest_duration": round(longest_duration, 3),
         "average_duration": average_duration,
     }
 
+    # 截止时间触发时报告为部分结果, 用完成度标明覆盖范围
+    summary["completed_hosts"] = summary["total_hosts"] - summary["timeout_hosts"]
+    summary["completeness"] = (
+        round(summary["completed_hosts"] / summary["total_hosts"], 3) if results else 1.0
+    )
+
+    manifests = [r["collected"] for r in results if r.get("collected")]
+    if manifests:
+        summary["collected_files"] = sum(
+            len([f for f in m["files"] if f["status"] in {"collected", "resumed"}]) for m in manifests
+        )
+        summary["collected_bytes"] = sum(m["bytes"] for m in manifests)
+
+    schedule_stats = _build_schedule_stats(results)
+    if schedule_stats:
+        summary["scheduling"] = schedule_stats
+
+    for key, value in (summary_extra or {}).items():
+        if isinstance(value, dict) and isinstance(summary.get(key), dict):
+            summary[key].update(value)
+        else:
+            summary[key] = value
+
+    stored_results, blobs = _dedup_outputs(results)
+    summary["total_outputs"] = sum(len(r.get("check_refs", {})) for r in stored_results)
+    summary["unique_outputs"] = len(blobs)
+
     report_content = {
         "summary": summary,
-        "results": results,
+        "results": stored_results,
+        "blobs": blobs,
+        "divergence": _build_divergence(stored_results),
     }  # 预留给未来的 Jinja2 HTML 渲染
 
     logger.info("-----正在生成报告-----")
     try:
+        # 目录延迟到首次写报告时创建, import 本模块不再有副作用
+        Path(output_file).parent.mkdir(parents=True, exist_ok=True)
         with open(output_file, "w", encoding="utf-8") as f:
             json.dump(report_content, f, ensure_ascii=False, indent=4)
         logger.info("-----报告生成成功: %s-----", output_file)
@@ -43,3 +81,107 @@ def generate_report(results: List[Dict], output_file: str = None) -> str:
     except Exception as e:
         logger.exception("[错误]: 写入报告失败: %s", e)
         return None
+
+
+def load_report(report_path: Union[str, Path]) -> Dict[str, Any]:
+    """读取报告并把 check_refs 还原为 checks, 兼容未去重的旧报告."""
+    with open(report_path, "r", encoding="utf-8") as fp:
+        return resolve_report(json.load(fp))
+
+
+def resolve_report(report_content: Dict[str, Any]) -> Dict[str, Any]:
+    """Inline blob references so every result carries its full checks again.
+
+    引用了不存在的 blob 说明报告已损坏, 抛出 ValueError 而不是静默返回空输出.
+    """
+    blobs = report_content.get("blobs") or {}
+    for result in report_content.get("results", []):
+        refs = result.pop("check_refs", None)
+        if refs is None:
+            continue
+        missing = sorted({digest for digest in refs.values() if digest not in blobs})
+        if missing:
+            name = result.get("name") or result.get("host")
+            raise ValueError(f"报告损坏: 主机 {name} 引用的输出 {', '.join(missing)} 不存在")
+        result["checks"] = {cmd: blobs[digest] for cmd, digest in refs.items()}
+    return report_content
+
+
+def _build_schedule_stats(results: List[Dict]) -> Dict[str, Any]:
+    """对比调度预测耗时与实际耗时, 用于衡量慢主机优先的收益.
+
+    只有 success 的主机参与对比: 失败/超时的 duration 是重试或截止时间, 不是真实耗时.
+    """
+    scheduled = [r for r in results if "predicted_duration" in r]
+    if not scheduled:
+        return {}
+    predicted = [r for r in scheduled if r["predicted_duration"] is not None]
+    compared = [r for r in predicted if r.get("status") == "success"]
+    errors = [abs(r["predicted_duration"] - r.get("duration", 0)) for r in compared]
+    return {
+        "predicted_hosts": len(predicted),
+        "unpredicted_hosts": len(scheduled) - len(predicted),
+        "compared_hosts": len(compared),
+        "low_priority_hosts": len([r for r in scheduled if r.get("schedule_lane") == "low"]),
+        "predicted_total": round(sum(r["predicted_duration"] for r in compared), 3),
+        "actual_total": round(sum(r.get("duration", 0) for r in compared), 3),
+        "mean_abs_error": round(sum(errors) / len(errors), 3) if errors else 0,
+    }
+
+
+def _dedup_outputs(results: List[Dict]) -> Tuple[List[Dict], Dict[str, str]]:
+    """Split outputs into a digest->output blob table plus per-host check_refs."""
+    blobs: Dict[str, str] = {}
+    stored_results = []
+    for result in results:
+        stored = {k: v for k, v in result.items() if k != "checks"}
+        refs = {}
+        for cmd, output in (result.get("checks") or {}).items():
+            digest = output_digest(output)
+            blobs.setdefault(digest, output)
+            refs[cmd] = digest
+        stored["check_refs"] = refs
+        stored_results.append(stored)
+    return stored_results, blobs
+
+
+def _build_divergence(stored_results: List[Dict]) -> Dict[str, Dict[str, Any]]:
+    """按命令找出多数派输出, 列出与多数派不同的主机.
+
+    只有超过半数主机输出相同才算多数派; 否则标记 no_majority 并列出各输出的主机数.
+    主机按结果下标区分, 同名/同 IP 的清单条目不会互相覆盖, 名称只用于展示.
+    """
+    by_command: Dict[str, Dict[int, str]] = defaultdict(dict)
+    for index, result in enumerate(stored_results):
+        for cmd, digest in result.get("check_refs", {}).items():
+            by_command[cmd][index] = digest
+
+    divergence = {}
+    for cmd, host_digests in by_command.items():
+        counts = Counter(host_digests.values())
+        if len(counts) < 2:
+            continue
+        majority, majority_count = counts.most_common(1)[0]
+        if majority_count * 2 <= len(host_digests):
+            divergence[cmd] = {
+                "majority": None,
+                "no_majority": True,
+                "total_hosts": len(host_digests),
+                "variants": dict(counts.most_common()),
+            }
+            continue
+        divergence[cmd] = {
+            "majority": majority,
+            "majority_hosts": majority_count,
+            "total_hosts": len(host_digests),
+            "outliers": [
+                {
+                    "name": stored_results[index].get("name") or stored_results[index].get("host"),
+                    "host": stored_results[index].get("host"),
+                    "digest": digest,
+                }
+                for index, digest in host_digests.items()
+                if digest != majority
+            ],
+        }
+    return divergence
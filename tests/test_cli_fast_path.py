@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_importing_main_skips_heavy_modules():
+    code = (
+        "import sys, main; "
+        "print(','.join(m for m in ('paramiko', 'pydantic', 'fastapi') if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    assert proc.stdout.strip() == ""
+
+
+def test_dry_run_lists_matched_hosts_without_ssh(tmp_path):
+    hosts_file = tmp_path / "hosts.json"
+    hosts_file.write_text(
+        json.dumps(
+            {
+                "hosts": [
+                    {"host": "10.0.0.1", "name": "web-1", "username": "root", "password": "x", "tags": {"env": "prod"}},
+                    {"host": "10.0.0.2", "name": "dev-1", "username": "root", "password": "x", "tags": {"env": "dev"}},
+                ]
+            }
+        ),
+        encoding="utf-8",
+    )
+    code = (
+        "import sys, main; main.main(); "
+        "print('paramiko loaded' if 'paramiko' in sys.modules else 'paramiko skipped')"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code, "--hosts", str(hosts_file), "--tags", "env=prod", "--dry-run"],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert "web-1" in proc.stdout
+    assert "dev-1" not in proc.stdout
+    assert "$ uptime" in proc.stdout
+    assert "paramiko skipped" in proc.stdout
+
+
+def test_non_positive_deadline_is_rejected(tmp_path):
+    proc = subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "main.py"), "--deadline", "0", "--dry-run"],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 2
+    assert "--deadline" in proc.stderr
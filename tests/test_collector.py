@@ -0,0 +1,172 @@
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from checker.collector import FileCollector
+
+
+class FakeRemoteFile:
+    def __init__(self, path):
+        self._fp = open(path, "rb")
+        self.prefetched = None
+
+    def seek(self, offset):
+        self._fp.seek(offset)
+
+    def prefetch(self, file_size, max_concurrent_requests=None):
+        self.prefetched = file_size
+
+    def read(self, size):
+        return self._fp.read(size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._fp.close()
+
+
+class FakeSFTP:
+    """Serve a local directory as if it were the remote filesystem root."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.opened = []
+
+    def _attrs(self, path):
+        st = os.stat(path)
+        return SimpleNamespace(filename=Path(path).name, st_mode=st.st_mode, st_size=st.st_size, st_mtime=st.st_mtime)
+
+    def stat(self, path):
+        return self._attrs(self.root / path.lstrip("/"))
+
+    def listdir_attr(self, path):
+        directory = self.root / path.lstrip("/")
+        return [self._attrs(child) for child in directory.iterdir()]
+
+    def open(self, path, mode):
+        self.opened.append(path)
+        return FakeRemoteFile(self.root / path.lstrip("/"))
+
+    def close(self):
+        pass
+
+
+class FakeSSH:
+    def __init__(self, sftp):
+        self.sftp = sftp
+
+    def open_sftp(self):
+        return self.sftp
+
+
+def _remote_tree(tmp_path):
+    remote = tmp_path / "remote"
+    (remote / "etc" / "nginx").mkdir(parents=True)
+    (remote / "etc" / "nginx" / "a.conf").write_text("server a\n")
+    (remote / "etc" / "nginx" / "b.conf").write_text("server b\n")
+    (remote / "etc" / "nginx" / "mime.types").write_text("types\n")
+    (remote / "var" / "log").mkdir(parents=True)
+    (remote / "var" / "log" / "messages").write_bytes(b"x" * 100_000)
+    return remote
+
+
+def test_collect_globs_limits_and_skips_unchanged(tmp_path):
+    sftp = FakeSFTP(_remote_tree(tmp_path))
+    collector = FileCollector(paths=["/etc/nginx/*.conf", "/var/log/messages"], dest_dir=tmp_path / "out")
+    host = {"host": "10.0.0.1", "name": "web-1", "collect_max_files": 2}
+
+    manifest = collector.collect(FakeSSH(sftp), host)
+
+    statuses = {f["remote"]: f["status"] for f in manifest["files"]}
+    assert statuses == {
+        "/etc/nginx/a.conf": "collected",
+        "/etc/nginx/b.conf": "collected",
+        "/var/log/messages": "skipped",
+    }
+    assert (tmp_path / "out" / "web-1" / "etc" / "nginx" / "a.conf").read_text() == "server a\n"
+
+    second = collector.collect(FakeSSH(sftp), host)
+    assert [f["status"] for f in second["files"][:2]] == ["unchanged", "unchanged"]
+    assert second["bytes"] == 0
+
+
+def test_collect_resumes_partial_download(tmp_path):
+    sftp = FakeSFTP(_remote_tree(tmp_path))
+    collector = FileCollector(paths=["/var/log/messages"], dest_dir=tmp_path / "out")
+    host = {"host": "10.0.0.1", "name": "web-1"}
+
+    collector.collect(FakeSSH(sftp), host)
+    local = tmp_path / "out" / "web-1" / "var" / "log" / "messages"
+    # 模拟上次中断: 完成记录回退为 partial, 本地只留前 40000 字节
+    state_file = local.parents[2] / ".collect_state.json"
+    state = json.loads(state_file.read_text())
+    state["partial"], state["files"] = state["files"], {}
+    state_file.write_text(json.dumps(state))
+    local.rename(local.with_name("messages.part"))
+    with open(local.with_name("messages.part"), "r+b") as fp:
+        fp.truncate(40_000)
+
+    manifest = collector.collect(FakeSSH(sftp), host)
+
+    entry = manifest["files"][0]
+    assert entry["status"] == "resumed" and entry["resumed_from"] == 40_000
+    assert entry["bytes"] == 60_000
+    assert local.read_bytes() == b"x" * 100_000
+
+
+def test_collect_compresses_on_the_fly(tmp_path):
+    sftp = FakeSFTP(_remote_tree(tmp_path))
+    collector = FileCollector(paths=["/var/log/messages"], dest_dir=tmp_path / "out", compress=True)
+
+    manifest = collector.collect(FakeSSH(sftp), {"host": "10.0.0.1"})
+
+    local = Path(manifest["files"][0]["local"])
+    assert local.name == "messages.gz"
+    assert gzip.decompress(local.read_bytes()) == b"x" * 100_000
+
+
+def test_collect_rejects_paths_escaping_the_host_dir(tmp_path):
+    remote = _remote_tree(tmp_path)
+    (tmp_path / "outside.txt").write_text("secret\n")
+
+    class HostileSFTP(FakeSFTP):
+        def listdir_attr(self, path):
+            entries = super().listdir_attr(path)
+            entries.append(SimpleNamespace(filename="../../evil.conf", st_mode=entries[0].st_mode, st_size=1, st_mtime=0))
+            return entries
+
+    collector = FileCollector(paths=["/etc/nginx/*.conf", "/../outside.txt"], dest_dir=tmp_path / "out")
+    manifest = collector.collect(FakeSSH(HostileSFTP(remote)), {"host": "10.0.0.1", "name": "web-1"})
+
+    statuses = {f["remote"]: f["status"] for f in manifest["files"]}
+    assert statuses["/etc/nginx/../../evil.conf"] == "failed"
+    assert statuses["/../outside.txt"] == "failed"
+    assert statuses["/etc/nginx/a.conf"] == "collected"
+    assert not (tmp_path / "out" / "outside.txt").exists()
+
+
+def test_collect_host_dirs_are_unique_and_stay_under_dest_dir(tmp_path):
+    sftp = FakeSFTP(_remote_tree(tmp_path))
+    collector = FileCollector(paths=["/etc/nginx/a.conf"], dest_dir=tmp_path / "out")
+
+    first = collector.collect(FakeSSH(sftp), {"host": "10.0.0.1", "port": 22})
+    second = collector.collect(FakeSSH(sftp), {"host": "10.0.0.1", "port": 2222})
+    dotted = collector.collect(FakeSSH(sftp), {"host": "10.0.0.2", "name": ".."})
+    collector.collect(FakeSSH(sftp), {"host": "10.0.0.3", "name": "web 1"})
+
+    assert Path(first["dir"]).name == "10.0.0.1"
+    assert Path(second["dir"]).name == "10.0.0.1_2222"
+    assert Path(dotted["dir"]).resolve().parent == (tmp_path / "out").resolve()
+    with pytest.raises(ValueError, match="web_1"):
+        collector.collect(FakeSSH(sftp), {"host": "10.0.0.4", "name": "web_1"})
+    assert not list((tmp_path / "out").rglob("*.tmp"))
@@ -0,0 +1,151 @@
+import socket
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from pathlib import Path
+
+import pytest
+import uvicorn
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from app import api
+from app.coordinator import coordinate, split_shards
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def local_workers(monkeypatch, tmp_path):
+    """Start worker instances of the FastAPI app on separate local ports."""
+    monkeypatch.chdir(tmp_path)
+    calls = []
+
+    def fake_inspect_hosts(hosts, **kwargs):
+        calls.append(kwargs)
+        return [
+            {"name": h["name"] or h["host"], "host": h["host"], "status": "success", "alerts": [], "checks": {"uptime": "up"}, "duration": 0.01}
+            for h in hosts
+        ]
+
+    monkeypatch.setattr(api, "inspect_hosts", fake_inspect_hosts)
+    servers = []
+
+    def start(count):
+        urls = []
+        for _ in range(count):
+            port = _free_port()
+            server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=port, log_level="warning"))
+            threading.Thread(target=server.run, daemon=True).start()
+            while not server.started:
+                time.sleep(0.01)
+            servers.append(server)
+            urls.append(f"http://127.0.0.1:{port}")
+        return urls
+
+    start.calls = calls
+    yield start
+    for server in servers:
+        server.should_exit = True
+
+
+def _hosts():
+    return [
+        {"host": f"10.0.{i % 3}.{i}", "name": f"h{i}", "username": "root", "password": "x", "tags": {"region": f"r{i % 3}"}}
+        for i in range(9)
+    ]
+
+
+def test_split_shards_groups_by_tag_and_caps_size():
+    shards = split_shards(_hosts(), shard_by="region", max_shard_size=2)
+    assert sorted(s["id"] for s in shards) == ["r0#0", "r0#1", "r1#0", "r1#1", "r2#0", "r2#1"]
+    assert all(len(s["hosts"]) <= 2 for s in shards)
+
+
+def test_coordinate_merges_results_from_local_workers(local_workers):
+    workers = local_workers(2)
+
+    results, stats = coordinate(_hosts(), workers, max_shard_size=2)
+
+    assert sorted(r["name"] for r in results) == [f"h{i}" for i in range(9)]
+    assert all(r["status"] == "success" for r in results)
+    assert sum(w["hosts"] for w in stats["workers"].values()) == 9
+    assert stats["reassigned_shards"] == 0
+
+
+def test_coordinate_reassigns_shards_from_dead_worker(local_workers):
+    dead = f"http://127.0.0.1:{_free_port()}"
+    workers = [dead] + local_workers(1)
+
+    results, stats = coordinate(_hosts(), workers, shard_timeout=5)
+
+    assert len(results) == 9
+    assert all(r["status"] == "success" and r["worker"] == workers[1] for r in results)
+    assert stats["workers"][dead]["alive"] is False
+    assert stats["reassigned_shards"] >= 1
+
+
+def test_coordinate_forwards_run_options_to_workers(local_workers):
+    workers = local_workers(2)
+
+    coordinate(_hosts(), workers, deadline=30, use_history=False, collect=["/var/log/messages"], collect_bwlimit=100)
+
+    assert local_workers.calls
+    for kwargs in local_workers.calls:
+        assert kwargs["duration_store"] is None
+        assert kwargs["collector"].paths == ["/var/log/messages"]
+        assert kwargs["collector"].limiter.rate == 50 * 1024
+        assert 0 < kwargs["deadline"] <= 30
+
+
+def test_coordinate_fails_rejected_shard_without_dropping_worker(local_workers):
+    workers = local_workers(2)
+    hosts = _hosts()
+    del hosts[0]["username"]  # worker 的 ShardRequest 校验失败 → HTTP 422
+
+    results, stats = coordinate(hosts, workers, max_shard_size=1)
+
+    failed = [r for r in results if r["status"] == "failed"]
+    assert [r["name"] for r in failed] == ["h0"]
+    assert "HTTP 422" in failed[0]["error"]
+    assert len(results) == 9
+    assert stats["reassigned_shards"] == 0
+    assert all(w["alive"] for w in stats["workers"].values())
+
+
+def test_coordinate_marks_undispatched_shards_timeout(local_workers, monkeypatch):
+    workers = local_workers(1)
+    slow_inspect = api.inspect_hosts
+
+    def fake_slow_inspect(hosts, **kwargs):
+        time.sleep(0.3)
+        return slow_inspect(hosts, **kwargs)
+
+    monkeypatch.setattr(api, "inspect_hosts", fake_slow_inspect)
+
+    results, _stats = coordinate(_hosts(), workers, deadline=0.5, max_shard_size=1)
+
+    statuses = [r["status"] for r in results]
+    assert len(results) == 9
+    assert "success" in statuses and "timeout" in statuses
+    assert "failed" not in statuses
+
+
+def test_coordinate_endpoint_applies_log_level(local_workers, monkeypatch):
+    workers = local_workers(1)
+    levels = []
+    monkeypatch.setattr(api, "setup_logging", lambda level_name, *args, **kwargs: levels.append(level_name))
+    monkeypatch.setattr(api, "load_settings", lambda _path: SimpleNamespace(hosts=[api.Host(**h) for h in _hosts()]))
+    monkeypatch.setattr(api, "generate_report", lambda results, **_kwargs: None)
+
+    with pytest.raises(api.HTTPException):
+        api.run_coordinated(api.CoordinateRequest(workers=workers, log_level="DEBUG"))
+
+    assert levels == ["DEBUG"]
@@ -0,0 +1,120 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import paramiko
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from checker import inspector
+from checker.host_keys import HostKeyStore, StoreHostKeyPolicy, UnknownHostKeyError, get_host_key_store, host_key_name
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return [paramiko.RSAKey.generate(1024) for _ in range(3)]
+
+
+def test_lookup_plain_and_hashed_entries(tmp_path, keys):
+    known_hosts = tmp_path / "known_hosts"
+    hashed = paramiko.HostKeys.hash_host("[10.0.0.2]:2222")
+    known_hosts.write_text(
+        "# comment\n"
+        f"10.0.0.1,web-1 ssh-rsa {keys[0].get_base64()}\n"
+        f"{hashed} ssh-rsa {keys[1].get_base64()}\n"
+        f"@revoked * ssh-rsa {keys[2].get_base64()}\n"
+    )
+
+    store = HostKeyStore(known_hosts)
+
+    assert store.lookup("web-1") == [keys[0]]
+    assert store.lookup(host_key_name("10.0.0.2", 2222)) == [keys[1]]
+    assert store.lookup("10.0.0.3") == []
+
+
+def test_tofu_keys_are_batched_and_reloadable(tmp_path, keys):
+    known_hosts = tmp_path / "ssh" / "known_hosts"
+    store = HostKeyStore(known_hosts)
+    policy = StoreHostKeyPolicy(store, "tofu")
+
+    threads = [
+        threading.Thread(target=policy.missing_host_key, args=(None, f"10.0.1.{i}", keys[i % 2]))
+        for i in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.lookup("10.0.1.3") == [keys[1]]
+    assert not known_hosts.exists()  # 运行中只入队, 不逐个写盘
+    assert store.flush() == 20
+    assert store.flush() == 0
+
+    lines = known_hosts.read_text().splitlines()
+    assert len(lines) == 20 and all(line.startswith("|1|") for line in lines)
+    reloaded = HostKeyStore(known_hosts)
+    assert reloaded.lookup("10.0.1.4") == [keys[0]]
+    assert paramiko.HostKeys(str(known_hosts)).lookup("10.0.1.4")["ssh-rsa"] == keys[0]
+
+
+def test_strict_policy_rejects_unknown_host(tmp_path, keys):
+    policy = StoreHostKeyPolicy(HostKeyStore(tmp_path / "known_hosts"), "strict")
+    with pytest.raises(paramiko.SSHException):
+        policy.missing_host_key(None, "10.0.0.9", keys[0])
+
+
+def test_flush_starts_on_a_new_line_when_file_lacks_trailing_newline(tmp_path, keys):
+    known_hosts = tmp_path / "known_hosts"
+    known_hosts.write_text(f"10.0.0.1 ssh-rsa {keys[0].get_base64()}")
+    store = HostKeyStore(known_hosts)
+    store.remember("10.0.0.2", keys[1])
+
+    assert store.flush() == 1
+
+    reloaded = HostKeyStore(known_hosts)
+    assert reloaded.lookup("10.0.0.1") == [keys[0]]
+    assert reloaded.lookup("10.0.0.2") == [keys[1]]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [UnknownHostKeyError("unknown (strict)"), paramiko.BadHostKeyException("10.0.0.1", None, None)],
+    ids=["strict", "bad-key"],
+)
+def test_connect_with_retry_does_not_retry_host_key_rejections(error):
+    class FakeSSH:
+        host = "10.0.0.1"
+        attempts = 0
+
+        def connect(self):
+            self.attempts += 1
+            raise error
+
+    ssh = FakeSSH()
+    with pytest.raises(type(error)):
+        inspector.connect_with_retry(ssh, retries=3)
+    assert ssh.attempts == 1
+
+
+def test_keys_learned_by_cancelled_sessions_are_flushed_later(monkeypatch, tmp_path, keys):
+    known_hosts = tmp_path / "known_hosts"
+    store = get_host_key_store(known_hosts)
+
+    def fake_inspect_single_host(host_config, default_commands, deadline=None, **_kwargs):
+        time.sleep(0.3)  # 会话在截止时间之后才完成首次连接
+        store.remember(host_config["host"], keys[0])
+        return {"host": host_config["host"], "status": "success", "alerts": [], "duration": 0.3}
+
+    monkeypatch.setattr(inspector, "inspect_single_host", fake_inspect_single_host)
+    results = inspector.inspect_hosts([{"host": "10.0.2.1", "username": "root"}], deadline=0.1)
+
+    assert results[0]["status"] == "timeout"
+    for thread in threading.enumerate():
+        if thread.name == "host-key-flush":
+            thread.join(5)
+    assert HostKeyStore(known_hosts).lookup("10.0.2.1") == [keys[0]]
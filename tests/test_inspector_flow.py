@@ -1,4 +1,6 @@
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import List
 
@@ -25,7 +27,7 @@ def test_inspect_hosts_filters_by_tags():
 def test_inspect_hosts_passes_overridden_commands(monkeypatch):
     captured_commands: List[str] = []
 
-    def fake_inspect_single_host(host_config, default_commands):
+    def fake_inspect_single_host(host_config, default_commands, **_kwargs):
         captured_commands.extend(default_commands)
         return {"host": host_config["host"], "status": "success", "alerts": [], "duration": 0}
 
@@ -36,3 +38,34 @@ def test_inspect_hosts_passes_overridden_commands(monkeypatch):
 
     assert captured_commands == ["whoami"]
     assert results and results[0]["status"] == "success"
+
+
+def test_inspect_hosts_deadline_marks_unfinished_hosts_timeout(monkeypatch):
+    class FakeSession:
+        def __init__(self):
+            self.aborted = threading.Event()
+
+        def abort(self):
+            self.aborted.set()
+
+    sessions = []
+
+    def fake_inspect_single_host(host_config, default_commands, deadline=None, **_kwargs):
+        if host_config["host"] == "fast":
+            return {"host": "fast", "status": "success", "alerts": [], "duration": 0}
+        session = FakeSession()
+        sessions.append(session)
+        deadline.register(session)
+        session.aborted.wait(5)
+        return {"host": host_config["host"], "status": "failed", "alerts": [], "duration": 5}
+
+    monkeypatch.setattr(inspector, "inspect_single_host", fake_inspect_single_host)
+
+    hosts = [{"host": h, "username": "root"} for h in ("fast", "slow-1", "slow-2")]
+    start = time.perf_counter()
+    results = inspector.inspect_hosts(hosts, max_workers=3, deadline=0.2)
+
+    assert time.perf_counter() - start < 2
+    statuses = {r["host"]: r["status"] for r in results}
+    assert statuses == {"fast": "success", "slow-1": "timeout", "slow-2": "timeout"}
+    assert all(session.aborted.is_set() for session in sessions)
@@ -0,0 +1,81 @@
+import json
+import logging
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import main
+
+
+@pytest.fixture
+def isolated_root_logger(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    yield root
+    main._stop_log_listener()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in saved_handlers:
+        root.addHandler(handler)
+    root.setLevel(saved_level)
+
+
+def _record(level, host=None):
+    record = logging.LogRecord("checker.inspector", level, __file__, 1, "msg %s", ("x",), None)
+    if host:
+        record.host = host
+        record.phase = "exec"
+    return record
+
+
+def test_host_sampler_is_stable_and_keeps_warnings():
+    sampler = main.HostSampler(0.1)
+    hosts = [f"10.0.{i // 256}.{i % 256}" for i in range(2000)]
+    kept = [h for h in hosts if sampler.filter(_record(logging.INFO, h))]
+
+    assert 100 < len(kept) < 300
+    assert kept == [h for h in hosts if sampler.filter(_record(logging.INFO, h))]
+    assert all(sampler.filter(_record(logging.WARNING, h)) for h in hosts)
+    assert sampler.filter(_record(logging.INFO))
+
+
+def test_setup_logging_reuses_listener_and_writes_json(isolated_root_logger):
+    main.setup_logging("INFO", json_format=True)
+    listener = main._log_listener
+    main.setup_logging("DEBUG", json_format=True)
+
+    assert main._log_listener is listener
+    assert isolated_root_logger.level == logging.DEBUG
+    assert len(isolated_root_logger.handlers) == 1
+
+    logging.getLogger("checker.inspector").info("→ %s: %s", "web-1", "success", extra={"host": "10.0.0.1", "phase": "done"})
+    main._stop_log_listener()
+
+    line = json.loads(Path("logs/app.log").read_text(encoding="utf-8").splitlines()[-1])
+    assert line["message"] == "→ web-1: success"
+    assert (line["host"], line["phase"]) == ("10.0.0.1", "done")
+
+
+def test_json_logs_keep_exception_tracebacks(isolated_root_logger):
+    main.setup_logging("INFO", json_format=True)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logging.getLogger("checker.inspector").exception("未知错误", extra={"host": "10.0.0.1", "phase": "exec"})
+    main._stop_log_listener()
+
+    line = json.loads(Path("logs/app.log").read_text(encoding="utf-8").splitlines()[-1])
+    assert line["message"] == "未知错误"
+    assert "RuntimeError: boom" in line["exc"]
+
+
+@pytest.mark.parametrize("rate", [0, -0.5, 1.5])
+def test_host_sampler_rejects_rates_outside_unit_interval(rate):
+    with pytest.raises(ValueError):
+        main.HostSampler(rate)
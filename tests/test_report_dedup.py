@@ -0,0 +1,80 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from checker.output_store import OutputStore
+from reporter.reporter import generate_report, load_report
+
+
+def _result(name, checks):
+    return {"name": name, "host": name, "status": "success", "alerts": [], "checks": checks, "duration": 0.1}
+
+
+def test_output_store_interns_identical_outputs():
+    store = OutputStore()
+    first = store.intern("Linux 6.1")
+    second = store.intern("".join(["Linux ", "6.1"]))
+    assert first is second
+    assert len(store) == 1 and store.total == 2
+
+
+def test_report_stores_each_output_once_and_reader_resolves(tmp_path):
+    results = [
+        _result("a", {"uname -r": "6.1", "uptime": "up 1 day"}),
+        _result("b", {"uname -r": "6.1", "uptime": "up 2 days"}),
+        _result("c", {"uname -r": "5.15", "uptime": "up 1 day"}),
+    ]
+    report_file = generate_report(results, output_file=tmp_path / "report.json")
+
+    raw = json.loads(Path(report_file).read_text(encoding="utf-8"))
+    assert len(raw["blobs"]) == 4
+    assert raw["summary"]["total_outputs"] == 6
+    assert "checks" not in raw["results"][0]
+    assert raw["divergence"]["uname -r"]["majority_hosts"] == 2
+    assert [o["name"] for o in raw["divergence"]["uname -r"]["outliers"]] == ["c"]
+
+    loaded = load_report(report_file)
+    assert loaded["results"][2]["checks"] == {"uname -r": "5.15", "uptime": "up 1 day"}
+
+
+def test_divergence_requires_strict_majority(tmp_path):
+    results = [
+        _result("a", {"uname -r": "6.1"}),
+        _result("b", {"uname -r": "6.1"}),
+        _result("c", {"uname -r": "5.15"}),
+        _result("d", {"uname -r": "5.10"}),
+    ]
+    report_file = generate_report(results, output_file=tmp_path / "report.json")
+
+    entry = json.loads(Path(report_file).read_text(encoding="utf-8"))["divergence"]["uname -r"]
+    assert entry["majority"] is None and entry["no_majority"] is True
+    assert sorted(entry["variants"].values()) == [1, 1, 2]
+
+
+def test_divergence_keeps_hosts_that_share_a_name(tmp_path):
+    results = [
+        _result("10.0.0.1", {"uname -r": "6.1"}),
+        _result("10.0.0.1", {"uname -r": "5.15"}),  # 同 IP 不同端口的两条清单
+        _result("b", {"uname -r": "6.1"}),
+    ]
+    report_file = generate_report(results, output_file=tmp_path / "report.json")
+
+    entry = json.loads(Path(report_file).read_text(encoding="utf-8"))["divergence"]["uname -r"]
+    assert entry["total_hosts"] == 3 and entry["majority_hosts"] == 2
+    assert [o["name"] for o in entry["outliers"]] == ["10.0.0.1"]
+
+
+def test_load_report_rejects_missing_blob(tmp_path):
+    report_file = generate_report([_result("a", {"uptime": "up 1 day"})], output_file=tmp_path / "report.json")
+    raw = json.loads(Path(report_file).read_text(encoding="utf-8"))
+    raw["blobs"] = {}
+    Path(report_file).write_text(json.dumps(raw), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="报告损坏"):
+        load_report(report_file)
@@ -0,0 +1,113 @@
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from checker import inspector
+from checker.scheduling import DurationStore, estimate_makespan, order_hosts
+from reporter.reporter import _build_schedule_stats
+
+
+def _store(tmp_path, entries):
+    store = DurationStore(tmp_path / "durations.json")
+    store.entries = entries
+    store._loaded = True
+    return store
+
+
+def test_order_hosts_longest_first_and_recent_failures_last(tmp_path):
+    now = time.time()
+    store = _store(
+        tmp_path,
+        {
+            "fast": {"duration": 1.0, "last_status": "success", "updated_at": now},
+            "slow": {"duration": 9.0, "last_status": "success", "updated_at": now},
+            "flaky": {"duration": 20.0, "last_status": "timeout", "updated_at": now},
+        },
+    )
+    hosts = [{"host": h} for h in ("fast", "flaky", "new", "slow")]
+
+    ordered, predictions, low_priority = order_hosts(hosts, store)
+
+    assert [h["host"] for h in ordered] == ["slow", "new", "fast", "flaky"]
+    assert predictions["new"] is None
+    assert low_priority == {"flaky"}
+
+
+def test_inspect_hosts_records_predictions_and_updates_store(monkeypatch, tmp_path):
+    submitted = []
+
+    def fake_inspect_single_host(host_config, default_commands, **_kwargs):
+        submitted.append(host_config["host"])
+        return {"host": host_config["host"], "status": "success", "alerts": [], "duration": 2.0}
+
+    monkeypatch.setattr(inspector, "inspect_single_host", fake_inspect_single_host)
+    store = _store(tmp_path, {"b": {"duration": 4.0, "last_status": "success", "updated_at": time.time()}})
+
+    hosts = [{"host": "a", "username": "root"}, {"host": "b", "username": "root"}]
+    results = inspector.inspect_hosts(hosts, max_workers=1, duration_store=store)
+
+    assert submitted == ["b", "a"]
+    assert {r["host"]: r["predicted_duration"] for r in results} == {"a": None, "b": 4.0}
+    saved = DurationStore(tmp_path / "durations.json").load()
+    assert saved.predict("b") == 3.0
+    assert saved.predict("a") == 2.0
+    assert store.last_run["wall_time"] >= 0
+    assert store.last_run["predicted_wall_time_scheduled"] == 8.0
+
+
+def test_failed_runs_do_not_skew_duration_history(tmp_path):
+    store = _store(tmp_path, {"a": {"duration": 2.0, "last_status": "success", "updated_at": 0}})
+
+    store.update([{"host": "a", "status": "timeout", "duration": 60.0}], now=100.0)
+
+    assert store.entries["a"] == {"duration": 2.0, "last_status": "timeout", "updated_at": 100.0}
+    assert store.recently_failed("a", now=200.0)
+
+
+def test_concurrent_saves_merge_instead_of_overwriting(tmp_path):
+    first = DurationStore(tmp_path / "durations.json").load()
+    second = DurationStore(tmp_path / "durations.json").load()
+
+    first.update([{"host": "a", "status": "success", "duration": 1.0}])
+    second.update([{"host": "b", "status": "success", "duration": 2.0}])
+    first.save()
+    second.save()
+
+    saved = DurationStore(tmp_path / "durations.json").load()
+    assert saved.predict("a") == 1.0
+    assert saved.predict("b") == 2.0
+
+
+def test_estimate_makespan_longest_first_beats_inventory_order():
+    hosts = [{"host": h} for h in ("a", "b", "c", "slow")]
+    predictions = {"a": 1.0, "b": 1.0, "c": 1.0, "slow": 3.0}
+
+    assert estimate_makespan(hosts, predictions, max_workers=2) == 4.0
+    assert estimate_makespan(hosts[::-1], predictions, max_workers=2) == 3.0
+
+
+def test_hosts_left_queued_by_deadline_do_not_enter_low_priority(monkeypatch, tmp_path):
+    def fake_inspect_single_host(host_config, default_commands, **_kwargs):
+        time.sleep(0.5)
+        return {"host": host_config["host"], "status": "success", "alerts": [], "duration": 0.5}
+
+    monkeypatch.setattr(inspector, "inspect_single_host", fake_inspect_single_host)
+    history = {h: {"duration": 1.0, "last_status": "success", "updated_at": time.time()} for h in ("a", "b", "c")}
+    store = _store(tmp_path, history)
+    hosts = [{"host": h, "username": "root"} for h in ("a", "b", "c")]
+
+    results = inspector.inspect_hosts(hosts, max_workers=1, deadline=0.2, duration_store=store)
+
+    assert {r["host"]: r.get("not_started", False) for r in results} == {"a": False, "b": True, "c": True}
+    saved = DurationStore(tmp_path / "durations.json").load()
+    assert saved.entries["b"]["last_status"] == "success"
+    _ordered, _predictions, low_priority = order_hosts(hosts, saved)
+    assert low_priority == {"a"}
+
+    stats = _build_schedule_stats(results)
+    assert stats["predicted_hosts"] == 3 and stats["compared_hosts"] == 0
+    assert stats["actual_total"] == 0 and stats["mean_abs_error"] == 0